@@ -0,0 +1,67 @@
+# benchmark find_U0_bnd and inverse_midp across a grid of regimes, and save the results to JSON
+# so that runs before and after a change can be compared (see compare_benchmarks)
+
+import sys
+sys.path.insert(0,'../..') # allows us to import undetected extinctions package
+
+import os
+import csv
+
+from undetected_extinctions.undetected_extinctions import frst_last_changed_E, get_SE
+from undetected_extinctions.benchmark.benchmark import get_regimes, get_data_regimes, run_benchmark, save_benchmark, time_classical
+
+
+# user parameters
+# ---
+
+ncalls = 200                    # how many calls to time per regime
+nreps = 1000                    # how many replicates to time whole classical runs with
+omegaV = [None, 0.172, 0.5]     # omega values, None is the central hypergeometric variant
+suffix = 'baseline'             # a suffix for the filename for the results
+
+
+# where databases are etc.
+# ---
+
+fname_frstlast = '../../data/processed/first_last_detns_final.csv'
+dir_results = '../../results/benchmark/'
+
+
+# get record of first and last observations
+# ---
+
+# read in data
+csv_f = csv.reader(open(fname_frstlast))
+header = next(csv_f)
+frst_last = [ ( int(row[1]), int(row[2]) ) for row in csv_f ]
+
+# modify record, so that we only take intervals where the number of detected extinct species E changes
+years_mod, frst_last_mod = frst_last_changed_E(frst_last)
+
+# calculate the S and E for the timeseries
+_, S, E = get_SE(frst_last_mod, years_mod)
+
+
+# run the benchmark on the synthetic and data regimes
+# ---
+
+regimes = get_regimes(omegaV)
+for omega in omegaV:
+    regimes += get_data_regimes(S, E, omega=omega)
+
+results = run_benchmark(regimes, ncalls=ncalls)
+
+
+# time whole classical runs, with the cost of drawing the confidence levels reported separately
+# ---
+
+results['classical'] = list()
+for omega in omegaV:
+
+    result = time_classical(S, E, nreps=nreps, omega=omega)
+    results['classical'].append(result)
+    print('classical omega = {:<6s} {:8.1f} reps/sec, of {:.2f} s, {:.4f} s drawing confidence levels'.format(
+        str(omega), result['reps_per_sec'], result['seconds'], result['rng_seconds'] ) )
+
+os.makedirs(dir_results, exist_ok=True)
+save_benchmark(results, dir_results + 'benchmark_' + suffix + '.json')
@@ -6,14 +6,13 @@ import sys
 sys.path.insert(0,'../../undetected_extinctions') # so I can import the undetected extinctions package
 
 import csv
+import json
+import logging
 import numpy as np
-from scipy.stats import uniform
 #import matplotlib.pyplot as plt
 
-from rpy2.robjects.packages import importr # so I can import R package BiasedUrn for the Fisher variant
-import rpy2.robjects.numpy2ri
-
-from undetected_extinctions import frst_last_changed_E, get_SE, find_U0_bnd
+from undetected_extinctions import frst_last_changed_E, get_SE, summarise_classical, summarise_classical_adaptive
+from undetected_extinctions import run_classical, ClassicalSummary, save_classical, file_sha256, load_checkpoint
 
 
 # user parameters
@@ -22,6 +21,13 @@ from undetected_extinctions import frst_last_changed_E, get_SE, find_U0_bnd
 U_T = 0         # assume that at the final timestep there are no undetected species remaining
 percentile = 95 # CI that I want
 nreps = 10000   # how many samples to take
+seed = None     # set to an integer to make the replicates reproducible
+nworkers = None # number of worker processes, default the number of CPUs
+sampler = 'mc'  # how the confidence levels are drawn: 'mc', or quasi-Monte Carlo 'sobol' or 'lhs'
+resume = True   # continue an interrupted run from its checkpoint file, which is removed when a run finishes
+profile = '--profile' in sys.argv # with --profile, save a summary of where the time went to a JSON file
+save_replicates = False # also save the replicates U and X (not with tol), which needs memory for all of them
+tol = None      # if set, ignore nreps and sample until the standard errors of the CI endpoints of U_0 and X_T are below tol
 
 '''
 # basic result, omega == 0
@@ -33,17 +39,23 @@ omega = 0.172    # central hypergeometric variant
 suffix = 'fisher_172' # a suffix for the filename for the results
 #nreps = 1000   # how many samples to take
 
+use_biasedurn = False   # compute the Fisher variant with the R package BiasedUrn instead of natively
+
 # where databases are etc.
 # ---
 
 fname_frstlast = '../../data/processed/first_last_detns_final.csv'
 dir_results = '../../results/classical/'
+fname_checkpoint = dir_results + 'classical_' + suffix + '.ckpt' # where the progress of a run is saved
 
 
-# connect rpy2 if we are using the Fisher variant
+# connect rpy2 if we are using BiasedUrn for the Fisher variant
 # ---
 
-if omega:
+if omega and use_biasedurn:
+
+    from rpy2.robjects.packages import importr # so I can import R package BiasedUrn for the Fisher variant
+    import rpy2.robjects.numpy2ri
 
     rpy2.robjects.numpy2ri.activate()
     biasedurn = importr('BiasedUrn')
@@ -79,67 +91,54 @@ T_idx = len(S)                          # number of timesteps
 # repeatedly sample
 # ---
 
-UM = list() # a place to store our replicates
-XM = list() # a place to store our replicates
-
-tV = list( reversed(range(1,T_idx)) ) # list of timesteps to work backwards through
-
-for nrep in range(nreps):
-
-    # print replicate number every 10th
+logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s') # progress is logged after each shard
+stats = dict() # counts and timers of the run
 
-    if nrep % 10 == 0:
-        print(nrep)
+# replicates are worked backwards through the time series together, randomly sampling confidence levels,
+# in shards shared between worker processes (BiasedUrn can't be sent to the workers). Each shard is added
+# to the per-timestep summary statistics as it's completed, so nreps can be very large
+if biasedurn is not None:
+    nworkers = 1
 
-    # work our way backwards through the time series, randomly sampling confidence leve
+# the root of the random streams, drawn here so that its entropy can be stored with the results;
+# if seed is None, an interrupted run is resumed with the entropy it was started with
+state = load_checkpoint(fname_checkpoint) if resume else None
+root_seed = np.random.SeedSequence(state['entropy'] if seed is None and state is not None else seed)
 
-    U = [0]*T_idx # a place to store this replicate
-    U[-1] = U_T
-    impossibleFlag = False
+if tol is None and save_replicates:
 
-    for t in tV: # work our way backwards
+    UM, XM = run_classical(S, E, U_T, nreps, omega, root_seed, nworkers, stats=stats, sampler=sampler, biasedurn=biasedurn)
+    summary = ClassicalSummary(len(S))
+    summary.update(UM, XM)
 
-        alpha = uniform.rvs()
-        S0 = S[t-1]; S1 = S[t]; U1 = U[t]; d0 = d[t-1]
-        U[t-1], impossibleFlag = find_U0_bnd(alpha, S0, S1, U1, d0, impossibleFlag, omega, biasedurn)
+elif tol is None:
 
+    UM = XM = None
+    summary = summarise_classical(S, E, U_T, nreps, omega, root_seed, nworkers, checkpoint=fname_checkpoint, resume=resume, sampler=sampler, stats=stats, biasedurn=biasedurn)
 
-    # calculate X_t from U_t
-
-    N = S[0]+E[0]+U[0] # assumes X(0) = 0
-    X = [ N - EE - SS - UU for EE, SS, UU in zip(E,S,U) ]
-
-    # append results
+else:
 
-    UM.append(U)
-    XM.append(X)
+    UM = XM = None
+    summary, seD = summarise_classical_adaptive(S, E, U_T, tol, omega, root_seed, nworkers, percentile=percentile, checkpoint=fname_checkpoint, resume=resume, sampler=sampler, stats=stats, biasedurn=biasedurn)
+    print('used ' + str(summary.nreps) + ' replicates, standard errors of the CI endpoints: ' + str(seD))
 
 
-# calculate statistics on sample
+# store statistics, with the metadata of the run, and the replicates if we kept them
 # ---
 
-UM = np.array(UM)
-XM = np.array(XM)
+meta = { 'omega': omega, 'U_T': U_T, 'seed': seed, 'entropy': root_seed.entropy, 'sampler': sampler, 'tol': tol,
+        'fname_frstlast': fname_frstlast, 'sha256_frstlast': file_sha256(fname_frstlast) }
+save_classical(dir_results + 'classical_' + suffix, years_mod, S, E, summary, percentile, meta, UM, XM)
 
-X_mean = np.mean(XM, axis=0)
-U_mean = np.mean(UM, axis=0)
+# and export the statistics to csv file
+summary.write_csv(dir_results + 'classical_' + suffix + '.csv', years_mod, S, E, percentile)
 
-X_lo = np.percentile(XM, (100-percentile)/2,       axis=0)
-X_hi = np.percentile(XM, 100 - (100-percentile)/2, axis=0)
 
-U_lo = np.percentile(UM, (100-percentile)/2,       axis=0)
-U_hi = np.percentile(UM, 100 - (100-percentile)/2, axis=0)
-
-
-# store statistics to csv file
+# store the profile of the run
 # ---
 
-f = open(dir_results + 'classical_' + suffix + '.csv', 'w')
-f.write('year,S,E,U_mean,X_mean,U_lo,U_hi,X_lo,X_hi\n')
-
-for row in zip(years_mod,S, E, U_mean, X_mean, U_lo, U_hi, X_lo, X_hi):
-    row_string = list(map( lambda v: str(v), row ))
-    f.write(','.join(row_string))
-    f.write('\n')
+if profile:
 
-f.close()
+    f = open(dir_results + 'classical_' + suffix + '_profile.json', 'w')
+    json.dump(stats, f, indent=1)
+    f.close()
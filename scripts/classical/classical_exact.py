@@ -0,0 +1,71 @@
+# find the classical confidence intervals exactly, by propagating the distribution of U backwards
+# through the time series instead of randomly sampling replicates
+
+
+import sys
+sys.path.insert(0,'../../undetected_extinctions') # so I can import the undetected extinctions package
+
+import csv
+
+from undetected_extinctions import frst_last_changed_E, get_SE, exact_classical, classical_fields
+
+
+# user parameters
+# ---
+
+U_T = 0         # assume that at the final timestep there are no undetected species remaining
+percentile = 95 # CI that I want
+tail_mass = 1e-12   # mid-P values below this are lumped into the last value of the curve
+prune_mass = 1e-12  # states with less probability than this are dropped
+
+# basic result, omega == 0
+omega = None    # central hypergeometric variant
+suffix = 'basic_result' # a suffix for the filename for the results
+'''
+# Fisher result to approximately match Brooks
+omega = 0.172    # Fisher's noncentral hypergeometric variant
+suffix = 'fisher_172' # a suffix for the filename for the results
+'''
+
+
+# where databases are etc.
+# ---
+
+fname_frstlast = '../../data/processed/first_last_detns_final.csv'
+dir_results = '../../results/classical/'
+
+
+# get record of first and last observations
+# ---
+
+# read in data
+csv_f = csv.reader(open(fname_frstlast))
+header = next(csv_f)
+frst_last = [ ( int(row[1]), int(row[2]) ) for row in csv_f ]
+
+# modify record, so that we only take intervals where the number of detected extinct species E changes
+years_mod, frst_last_mod = frst_last_changed_E(frst_last)
+
+# calculate the S and E for the timeseries
+_, S, E = get_SE(frst_last_mod, years_mod)
+
+
+# compute the distributions of U and X at each timestep
+# ---
+
+statsD, pmfD, error = exact_classical(S, E, U_T, omega, percentile, tail_mass, prune_mass)
+print('probability mass lost to truncation at most ' + str(error))
+
+
+# export the statistics to csv file, in the same format as classical.py
+# ---
+
+f = open(dir_results + 'classical_exact_' + suffix + '.csv', 'w')
+f.write(','.join(classical_fields) + '\n')
+
+for row in zip(years_mod, S, E, *[ statsD[field] for field in classical_fields[3:] ]):
+    row_string = list(map( lambda v: str(v), row ))
+    f.write(','.join(row_string))
+    f.write('\n')
+
+f.close()
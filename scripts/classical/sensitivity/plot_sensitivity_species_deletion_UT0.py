@@ -1,7 +1,10 @@
 import matplotlib.pyplot as plt
 import pickle
 import numpy as np
-import csv
+
+import sys
+sys.path.insert(0,'../../../undetected_extinctions') # so I can import the undetected extinctions package
+from undetected_extinctions import read_classical
 
 
 # name which file
@@ -23,11 +26,9 @@ f.close()
 
 # and classical result
 
-fname_classical = '../../../results/classical/classical_basic_result.csv'
-csv_f = csv.reader( open(fname_classical) )
-header = next(csv_f)
-c_res = [ [ float(ri) for ri in row ] for row in csv_f ]
-years_mod, S, E, U, X, _, _, _, _, = zip(* c_res )
+fname_classical = '../../../results/classical/classical_basic_result' # .npz if there is one, otherwise .csv
+c_res = read_classical(fname_classical)
+S = c_res['S']; E = c_res['E']; U = c_res['U_mean']
 
 N = S[0] + E[0] + U[0]              # assumes X(0) = 0
 extn_rate = (N-S[-1]-U[-1]) / N     # calculate extinction rate
@@ -7,11 +7,10 @@ sys.path.insert(0,'../../../undetected_extinctions') # so I can import the undet
 
 import csv
 import numpy as np
-from scipy.stats import uniform
 import matplotlib.pyplot as plt
 import pickle
 
-from undetected_extinctions import frst_last_changed_E, get_SE, find_U0_bnd
+from undetected_extinctions import frst_last_changed_E, get_SE, classical_replicates
 
 
 
@@ -26,6 +25,8 @@ percentile = 95 # CI that I want
 omega = None    # central hypergeometric variant
 biasedurn = None
 samples_per_UT = 1000 # how many samples to take to estimate statistics
+seed = None     # set to an integer to make the run reproducible
+common_random_numbers = True # use the same confidence levels for every U_T, so the differences between them aren't sampling noise
 
 
 # where databases are etc.
@@ -57,33 +58,22 @@ psi = S[:-1] - (E[1:]-E[:-1])           # survivors at each timestep
 extns = E[1:] - E[:-1]                  # extinctions at each timestep
 T_idx = len(S)                          # number of timesteps
 
-tV = list( reversed(range(1,T_idx)) ) # list of timesteps to work backwards through
+# each U_T gets its own random stream, or they all share one
+seedV = np.random.SeedSequence(seed).spawn(len(UTV))
+if common_random_numbers:
+    seedV = [ seedV[0] ]*len(UTV)
 
 extn_rateM = list()
-for U_T in UTV:
+for U_T, seed_UT in zip(UTV, seedV):
 
     print(U_T)
 
-    extn_rateV = list()
-    for sample in range(samples_per_UT):
-
-        # work our way backwards through the time series, randomly sampling confidence leve
-
-        U = [0]*T_idx # a place to store this replicate
-        U[-1] = U_T
-        impossibleFlag = False
-
-        for t in tV: # work our way backwards
-
-            alpha = uniform.rvs()
-            S0 = S[t-1]; S1 = S[t]; U1 = U[t]; d0 = d[t-1]
-            U[t-1], impossibleFlag = find_U0_bnd(alpha, S0, S1, U1, d0, impossibleFlag, omega, biasedurn)
-
-        # calculate summary info and store
-        N = S[0] + E[0] + U[0]              # assumes X(0) = 0
-        extn_rate = (N-S[-1]-U[-1]) / N     # calculate extinction rate
-        extn_rateV.append(extn_rate)        # append results
+    # work all the replicates backwards through the time series together, randomly sampling confidence levels
+    UM, _ = classical_replicates(S, E, U_T, samples_per_UT, omega, seed_UT, biasedurn=biasedurn)
 
+    # calculate summary info and store
+    N = S[0] + E[0] + UM[:,0]               # assumes X(0) = 0
+    extn_rateV = (N-S[-1]-UM[:,-1]) / N     # calculate extinction rate
     extn_rateM.append(extn_rateV)
 
 extn_rateM = np.array(extn_rateM)
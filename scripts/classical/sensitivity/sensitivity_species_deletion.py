@@ -2,16 +2,16 @@
 # create a plot of proportion of species included in the record versus inferred proportion extinctions
 
 
+import os
 import sys
 sys.path.insert(0,'../../../undetected_extinctions') # so I can import the undetected extinctions package
 
 import csv
 import numpy as np
-from scipy.stats import uniform
 import matplotlib.pyplot as plt
 import pickle
 
-from undetected_extinctions import frst_last_changed_E, get_SE, find_U0_bnd
+from undetected_extinctions import frst_last_changed_E, get_SE, classical_replicates, read_classical, save_checkpoint, resume_checkpoint, file_sha256
 
 
 # user parameters
@@ -31,11 +31,16 @@ subsets_per_proportion = 1000
 # for each subset, how many samples we should take to estimate the mean
 samples_per_subset = 30
 
+seed = None     # set to an integer to make the run reproducible
+common_random_numbers = True # every subset size uses the same random streams, so the subsets are nested and share confidence levels
+resume = True   # continue an interrupted run from its checkpoint file
+
 # where databases are etc.
 # ---
 
 fname_frstlast = '../../../data/processed/first_last_detns_final.csv'
 dir_results = '../../../results/classical/sensitivity/sensitivity_species_deletion/'
+fname_checkpoint = dir_results + 'sensitivity_spp_deletion.ckpt' # where the progress of the run is saved
 
 
 # get record of first and last observations, and other info
@@ -57,21 +62,48 @@ no_extant_full = last_full.count(tf) # number known extant
 no_spp_full = len(frst_last_full)
 subset_sizes = [ int(round(no_spp_full*propn)) for propn in proportions ]
 
-idxs = list(range(no_spp_full))
+# the results so far and the root of the random streams are saved after each sample,
+# so that an interrupted run can continue exactly where it stopped
 
-extn_rateM = list()
-for subset_size in subset_sizes:
+# the checkpoint must be of a run with the same parameters and data
+params = { 'proportions': [ float(propn) for propn in proportions ], 'tf': tf, 'omega': omega, 'biasedurn': biasedurn is not None,
+        'subsets_per_proportion': subsets_per_proportion, 'samples_per_subset': samples_per_subset, 'seed': seed,
+        'common_random_numbers': common_random_numbers, 'sha256_frstlast': file_sha256(fname_frstlast) }
+state, root_seed = resume_checkpoint(fname_checkpoint, resume, params, seed)
 
-    print(subset_size)
+if state is None:
+
+    extn_rateM = list()
     extn_rate_samples = list()
 
-    for sample in range(samples_per_subset):
+else:
+
+    extn_rateM = state['extn_rateM']
+    extn_rate_samples = state['extn_rate_samples']
+
+state = { 'params': params, 'entropy': root_seed.entropy, 'spawn_key': root_seed.spawn_key, 'n_children_spawned': root_seed.n_children_spawned }
+
+# each sample of each subset size gets its own random stream, or, with common random numbers,
+# the sample-th sample of every subset size shares one
+if common_random_numbers:
+    seedM = [ root_seed.spawn(samples_per_subset) ]*len(subset_sizes)
+else:
+    seedM = [ root_seed.spawn(samples_per_subset) for subset_size in subset_sizes ]
+
+for size_idx in range(len(extn_rateM), len(subset_sizes)):
+
+    subset_size = subset_sizes[size_idx]
+    print(subset_size)
+
+    for sample in range(len(extn_rate_samples), samples_per_subset):
+
+        rng = np.random.default_rng(seedM[size_idx][sample])
 
         # take the random subset of the full species list, and treat the same as we did for the full list
         # ---
 
-        # get random subset
-        subset_idxs = np.random.choice( idxs, subset_size, replace=False )
+        # get random subset (the first subset_size of a random ordering, so they're nested with common random numbers)
+        subset_idxs = rng.permutation(no_spp_full)[:subset_size]
         frst_last = [ frst_last_full[i] for i in subset_idxs ]
 
         # how many undetected extant species (i.e. species known to be extant that are missing from the subset
@@ -96,33 +128,17 @@ for subset_size in subset_sizes:
         # obtain a central estimate of extinction rate through repeated sampling of confidence level
         # ---
 
-        extn_rateV = list()
+        # work all the replicates backwards through the time series together, randomly sampling confidence levels
+        UM, _ = classical_replicates(S, E, U_T, samples_per_subset, omega, rng, biasedurn=biasedurn)
 
-        tV = list( reversed(range(1,T_idx)) ) # list of timesteps to work backwards through
+        # calculate summary info
+        N = S[0] + E[0] + UM[:,0]               # assumes X(0) = 0
+        extn_rateV = (N-S[-1]-UM[:,-1]) / N     # calculate extinction rate
 
-        for nrep in range(samples_per_subset):
+        extn_rate_samples.append( np.mean(extn_rateV) )
 
-            # work our way backwards through the time series, randomly sampling confidence leve
-
-            U = [0]*T_idx # a place to store this replicate
-            U[-1] = U_T
-            impossibleFlag = False
-
-            for t in tV: # work our way backwards
-
-                alpha = uniform.rvs()
-                S0 = S[t-1]; S1 = S[t]; U1 = U[t]; d0 = d[t-1]
-                U[t-1], impossibleFlag = find_U0_bnd(alpha, S0, S1, U1, d0, impossibleFlag, omega, biasedurn)
-
-
-            # calculate summary info
-            N = S[0] + E[0] + U[0]              # assumes X(0) = 0
-            extn_rate = (N-S[-1]-U[-1]) / N     # calculate extinction rate
-
-            # append results
-            extn_rateV.append(extn_rate)
-
-        extn_rate_samples.append( np.mean(extn_rate) )
+        state.update({ 'extn_rateM': extn_rateM, 'extn_rate_samples': extn_rate_samples })
+        save_checkpoint(fname_checkpoint, state)
 
     # append
     extn_rateM.append( extn_rate_samples )
@@ -134,6 +150,10 @@ for subset_size in subset_sizes:
     pickle.dump( extn_rate_samples, f )
     f.close()
 
+    extn_rate_samples = list()
+    state.update({ 'extn_rateM': extn_rateM, 'extn_rate_samples': extn_rate_samples })
+    save_checkpoint(fname_checkpoint, state)
+
 
 extn_rateM = np.array(extn_rateM)
 
@@ -145,15 +165,17 @@ f = open(dir_results + 'sensitivity_spp_deletion_all.pkl', 'wb')
 pickle.dump( extn_rateM, f )
 f.close()
 
+# the run is finished, so a later run starts afresh
+if os.path.isfile(fname_checkpoint):
+    os.remove(fname_checkpoint)
+
 
 # get the full result to append its point to the graph
 # ---
 
-fname_classical = '../../../results/classical/classical_basic_result.csv'
-csv_f = csv.reader( open(fname_classical) )
-header = next(csv_f)
-c_res = [ [ float(ri) for ri in row ] for row in csv_f ]
-years_mod, S, E, U, X, _, _, _, _, = zip(* c_res )
+fname_classical = '../../../results/classical/classical_basic_result' # .npz if there is one, otherwise .csv
+c_res = read_classical(fname_classical)
+S = c_res['S']; E = c_res['E']; U = c_res['U_mean']
 
 N = S[0] + E[0] + U[0]              # assumes X(0) = 0
 extn_rate = (N-S[-1]-U[-1]) / N     # calculate extinction rate
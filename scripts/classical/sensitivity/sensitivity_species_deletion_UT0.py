@@ -7,11 +7,10 @@ sys.path.insert(0,'../../../undetected_extinctions') # so I can import the undet
 
 import csv
 import numpy as np
-from scipy.stats import uniform
 import matplotlib.pyplot as plt
 import pickle
 
-from undetected_extinctions import frst_last_changed_E, get_SE, find_U0_bnd
+from undetected_extinctions import frst_last_changed_E, get_SE, classical_replicates, read_classical
 
 
 # user parameters
@@ -31,6 +30,9 @@ subsets_per_proportion = 1000
 # for each subset, how many samples we should take to estimate the mean
 samples_per_subset = 30
 
+seed = None     # set to an integer to make the run reproducible
+common_random_numbers = True # every subset size uses the same random streams, so the subsets are nested and share confidence levels
+
 # where databases are etc.
 # ---
 
@@ -57,21 +59,30 @@ no_extant_full = last_full.count(tf) # number known extant
 no_spp_full = len(frst_last_full)
 subset_sizes = [ int(round(no_spp_full*propn)) for propn in proportions ]
 
-idxs = list(range(no_spp_full))
+root_seed = np.random.SeedSequence(seed)
+
+# each sample of each subset size gets its own random stream, or, with common random numbers,
+# the sample-th sample of every subset size shares one
+if common_random_numbers:
+    seedM = [ root_seed.spawn(samples_per_subset) ]*len(subset_sizes)
+else:
+    seedM = [ root_seed.spawn(samples_per_subset) for subset_size in subset_sizes ]
 
 extn_rateM = list()
-for subset_size in subset_sizes:
+for size_idx, subset_size in enumerate(subset_sizes):
 
     print(subset_size)
     extn_rate_samples = list()
 
     for sample in range(samples_per_subset):
 
+        rng = np.random.default_rng(seedM[size_idx][sample])
+
         # take the random subset of the full species list, and treat the same as we did for the full list
         # ---
 
-        # get random subset
-        subset_idxs = np.random.choice( idxs, subset_size, replace=False )
+        # get random subset (the first subset_size of a random ordering, so they're nested with common random numbers)
+        subset_idxs = rng.permutation(no_spp_full)[:subset_size]
         frst_last = [ frst_last_full[i] for i in subset_idxs ]
 
         '''
@@ -100,33 +111,14 @@ for subset_size in subset_sizes:
         # obtain a central estimate of extinction rate through repeated sampling of confidence level
         # ---
 
-        extn_rateV = list()
-
-        tV = list( reversed(range(1,T_idx)) ) # list of timesteps to work backwards through
-
-        for nrep in range(samples_per_subset):
-
-            # work our way backwards through the time series, randomly sampling confidence leve
+        # work all the replicates backwards through the time series together, randomly sampling confidence levels
+        UM, _ = classical_replicates(S, E, U_T, samples_per_subset, omega, rng, biasedurn=biasedurn)
 
-            U = [0]*T_idx # a place to store this replicate
-            U[-1] = U_T
-            impossibleFlag = False
+        # calculate summary info
+        N = S[0] + E[0] + UM[:,0]               # assumes X(0) = 0
+        extn_rateV = (N-S[-1]-UM[:,-1]) / N     # calculate extinction rate
 
-            for t in tV: # work our way backwards
-
-                alpha = uniform.rvs()
-                S0 = S[t-1]; S1 = S[t]; U1 = U[t]; d0 = d[t-1]
-                U[t-1], impossibleFlag = find_U0_bnd(alpha, S0, S1, U1, d0, impossibleFlag, omega, biasedurn)
-
-
-            # calculate summary info
-            N = S[0] + E[0] + U[0]              # assumes X(0) = 0
-            extn_rate = (N-S[-1]-U[-1]) / N     # calculate extinction rate
-
-            # append results
-            extn_rateV.append(extn_rate)
-
-        extn_rate_samples.append( np.mean(extn_rate) )
+        extn_rate_samples.append( np.mean(extn_rateV) )
 
     # append
     extn_rateM.append( extn_rate_samples )
@@ -153,11 +145,9 @@ f.close()
 # get the full result to append its point to the graph
 # ---
 
-fname_classical = '../../../results/classical/classical_basic_result.csv'
-csv_f = csv.reader( open(fname_classical) )
-header = next(csv_f)
-c_res = [ [ float(ri) for ri in row ] for row in csv_f ]
-years_mod, S, E, U, X, _, _, _, _, = zip(* c_res )
+fname_classical = '../../../results/classical/classical_basic_result' # .npz if there is one, otherwise .csv
+c_res = read_classical(fname_classical)
+S = c_res['S']; E = c_res['E']; U = c_res['U_mean']
 
 N = S[0] + E[0] + U[0]              # assumes X(0) = 0
 extn_rate = (N-S[-1]-U[-1]) / N     # calculate extinction rate
@@ -7,11 +7,11 @@ import scipy.stats as stats
 
 import sys
 sys.path.insert(0,'../../../undetected_extinctions')    # so I can import the undetected extinctions package
-from undetected_extinctions import find_U0_bnd          # find_U0_bnd(alpha, S0, S1, U1, d0, impossibleFlag, omega, biasedurn)
+from undetected_extinctions import classical_replicates # all replicates of the classical method stepped backwards together
 from undetected_extinctions import SE_changed_E         # collapses timesteps with no detected extinctions
 
 # simulates one instance of a SEUX outcome, but mu_fnc and nu_fnc are now a function of t
-def simulate_t(U0, S0, mu_fnc, nu_fnc, T):
+def simulate_t(U0, S0, mu_fnc, nu_fnc, T, rng=None):
     '''
     S, E, U, X = simulate(U0, S0, mu_range, detn_array, T)
 
@@ -30,6 +30,8 @@ def simulate_t(U0, S0, mu_fnc, nu_fnc, T):
         Accepts t as an input, returns a value of nu, the detection probability
     T: integer
         The number of years to simulate
+    rng: numpy.random.Generator
+        Optional source of the random numbers (default numpy's global random state)
 
     Returns
     -------
@@ -50,10 +52,10 @@ def simulate_t(U0, S0, mu_fnc, nu_fnc, T):
 
         # how many, of both types, survive?
         mu = mu_fnc(t)
-        n = stats.binom( U[t-1]+S[t-1], 1-mu ).rvs()
+        n = stats.binom( U[t-1]+S[t-1], 1-mu ).rvs(random_state=rng)
 
         # survival process
-        Ut = stats.hypergeom( S[t-1] + U[t-1], U[t-1], n ).rvs()  # actually phi
+        Ut = stats.hypergeom( S[t-1] + U[t-1], U[t-1], n ).rvs(random_state=rng)  # actually phi
         St = n - Ut                                         # actually psi
 
         Et = E[t-1] + S[t-1] - St
@@ -61,7 +63,7 @@ def simulate_t(U0, S0, mu_fnc, nu_fnc, T):
 
         # detection process
         nu = nu_fnc(t)
-        detn = stats.binom( Ut, nu ).rvs()
+        detn = stats.binom( Ut, nu ).rvs(random_state=rng)
 
         St = St+detn
         Ut = Ut-detn
@@ -78,7 +80,7 @@ def simulate_t(U0, S0, mu_fnc, nu_fnc, T):
     return S, E, U, X
 
 # simulates one instance of a SEUX outcome
-def simulate(U0, S0, mu_fnc, nu_fnc, T):
+def simulate(U0, S0, mu_fnc, nu_fnc, T, rng=None):
     '''
     S, E, U, X = simulate(U0, S0, mu_range, detn_array, T)
 
@@ -97,6 +99,8 @@ def simulate(U0, S0, mu_fnc, nu_fnc, T):
         Accepts no inputs, returns a value of nu, the detection probability
     T: integer
         The number of years to simulate
+    rng: numpy.random.Generator
+        Optional source of the random numbers (default numpy's global random state)
 
     Returns
     -------
@@ -117,10 +121,10 @@ def simulate(U0, S0, mu_fnc, nu_fnc, T):
 
         # how many, of both types, survive?
         mu = mu_fnc()
-        n = stats.binom( U[t-1]+S[t-1], 1-mu ).rvs()
+        n = stats.binom( U[t-1]+S[t-1], 1-mu ).rvs(random_state=rng)
 
         # survival process
-        Ut = stats.hypergeom( S[t-1] + U[t-1], U[t-1], n ).rvs()  # actually phi
+        Ut = stats.hypergeom( S[t-1] + U[t-1], U[t-1], n ).rvs(random_state=rng)  # actually phi
         St = n - Ut                                         # actually psi
 
         Et = E[t-1] + S[t-1] - St
@@ -128,7 +132,7 @@ def simulate(U0, S0, mu_fnc, nu_fnc, T):
 
         # detection process
         nu = nu_fnc()
-        detn = stats.binom( Ut, nu ).rvs()
+        detn = stats.binom( Ut, nu ).rvs(random_state=rng)
 
         St = St+detn
         Ut = Ut-detn
@@ -145,7 +149,7 @@ def simulate(U0, S0, mu_fnc, nu_fnc, T):
     return S, E, U, X
 
 
-def get_coverage_estimates(nsims, nsamples, pcileV, U0, S0, T, mu_fnc, nu_fnc, collapse=False):
+def get_coverage_estimates(nsims, nsamples, pcileV, U0, S0, T, mu_fnc, nu_fnc, collapse=False, rng=None):
     '''
     cnt_withinV, U0_meanV = get_coverage_estimates(params, mu_fnc, nu_fnc)
 
@@ -170,6 +174,9 @@ def get_coverage_estimates(nsims, nsamples, pcileV, U0, S0, T, mu_fnc, nu_fnc, c
         Accepts no inputs, returns a value of mu, the extinction probability
     nu_fnc: function
         Accepts no inputs, returns a value of nu, the detection probability
+    rng: numpy.random.Generator or integer
+        Source (or seed) of the random numbers for the simulations and confidence levels, so the
+        coverage estimates can be reproduced
 
     Returns
     -------
@@ -180,6 +187,8 @@ def get_coverage_estimates(nsims, nsamples, pcileV, U0, S0, T, mu_fnc, nu_fnc, c
     '''
 
 
+    rng = np.random.default_rng(rng)
+
     # treatment of percentile depends on if we're doing one or two-sided
     edge_pV = (1-pcileV/100)/2
 
@@ -196,7 +205,7 @@ def get_coverage_estimates(nsims, nsamples, pcileV, U0, S0, T, mu_fnc, nu_fnc, c
         print('doing rep ' + str(nsim) )
 
         # get the simulation
-        S_orig, E_orig, U_orig, X_orig = simulate_t(U0, S0, mu_fnc, nu_fnc, T)
+        S_orig, E_orig, U_orig, X_orig = simulate_t(U0, S0, mu_fnc, nu_fnc, T, rng)
 
         if collapse:
             # collapse timesteps in which no detected extinctions
@@ -204,37 +213,14 @@ def get_coverage_estimates(nsims, nsamples, pcileV, U0, S0, T, mu_fnc, nu_fnc, c
         else:
             S = S_orig; E = E_orig
 
-        d = S[1:] - S[:-1] + E[1:] - E[:-1]     # discoveries at each timestep
-        psi = S[:-1] - (E[1:]-E[:-1])           # survivors at each timestep
-        extns = E[1:] - E[:-1]                  # extinctions at each timestep
-        T_idx = len(S)                          # number of timesteps
-        tV = list( reversed(range(1,T_idx)) )   # list of timesteps to work backwards through
-
-        # the minimum possible values of U_t are the number detected from t onwards + U_T
+        # the number of undetected species at the final timestep is known
         U_T = U_orig[-1]
-        min_poss_UV = [ U_T + sum(d[t-1:]) for t in range(1,T_idx) ]
-
-
-        # repeatedly sample to construct the CI
-
-        U0V = list()
-
-        for nsample in range(nsamples):
 
-            U = [0]*T_idx # a place to store this replicate
-            U[-1] = U_T
-            impossibleFlag = False
 
-            for t in tV:
+        # repeatedly sample to construct the CI, all the samples stepped backwards together
 
-                S0 = S[t-1]; S1 = S[t]; U1 = U[t]; d0 = d[t-1]
-
-                # if type_of_ci == 'midp':
-                alpha = stats.uniform.rvs()
-                min_poss_U0 = max( ( min_poss_UV[t-1], U1+d0 ) )
-                U[t-1], impossibleFlag = find_U0_bnd(alpha, S0, S1, U1, d0, impossibleFlag, None, None)
-
-            U0V.append( U[0] ) # store result
+        UM, _ = classical_replicates(S, E, U_T, nsamples, None, rng)
+        U0V = UM[:,0]
 
 
         # append mean
@@ -253,48 +239,26 @@ def get_coverage_estimates(nsims, nsamples, pcileV, U0, S0, T, mu_fnc, nu_fnc, c
     return cnt_withinV, U0_meanV
 
 # get an example of a simulation outcome and some sampled bounds
-def get_example(U0, S0, mu_fnc, nu_fnc, T, negs):
+def get_example(U0, S0, mu_fnc, nu_fnc, T, negs, rng=None):
+
+    rng = np.random.default_rng(rng)
 
     # get one simulation
     # ---
 
-    S_orig, E_orig, U_orig, X_orig = simulate_t(U0, S0, mu_fnc, nu_fnc, T)
+    S_orig, E_orig, U_orig, X_orig = simulate_t(U0, S0, mu_fnc, nu_fnc, T, rng)
 
     S = S_orig; E = E_orig
 
-    d = S[1:] - S[:-1] + E[1:] - E[:-1]     # discoveries at each timestep
-    psi = S[:-1] - (E[1:]-E[:-1])           # survivors at each timestep
-    extns = E[1:] - E[:-1]                  # extinctions at each timestep
-    T_idx = len(S)                          # number of timesteps
-    tV = list( reversed(range(1,T_idx)) )   # list of timesteps to work backwards through
-
-    # the minimum possible values of U_t are the number detected from t onwards + U_T
+    # the number of undetected species at the final timestep is known
     U_T = U_orig[-1]
-    min_poss_UV = [ U_T + sum(d[t-1:]) for t in range(1,T_idx) ]
 
 
     # do negs number of examples of sampling bounds back in time
     # ---
 
-    UV = list() # a place to store each of our examples
-
-    for egs in range(negs):
-
-        U = [0]*T_idx # a place to store this replicate
-        U[-1] = U_T
-        impossibleFlag = False
-
-        for t in tV:
-
-            S0 = S[t-1]; S1 = S[t]; U1 = U[t]; d0 = d[t-1]
-
-            # if type_of_ci == 'midp':
-            alpha = stats.uniform.rvs()
-            min_poss_U0 = max( ( min_poss_UV[t-1], U1+d0 ) )
-            U[t-1], impossibleFlag = find_U0_bnd(alpha, S0, S1, U1, d0, impossibleFlag, None, None)
-
-        # store this example
-        UV.append(U)
+    UM, _ = classical_replicates(S, E, U_T, negs, None, rng)
+    UV = [ list(U) for U in UM ] # each of our examples
 
     return S_orig, E_orig, U_orig, X_orig, UV
 
@@ -302,48 +266,26 @@ def get_example(U0, S0, mu_fnc, nu_fnc, T, negs):
 
 '''
 # plot an example of a simulation outcome and some sampled bounds
-def plot_example(U0, S0, mu_fnc, nu_fnc, T, negs, fName):
+def plot_example(U0, S0, mu_fnc, nu_fnc, T, negs, fName, rng=None):
+
+    rng = np.random.default_rng(rng)
 
     # get one simulation
     # ---
 
-    S_orig, E_orig, U_orig, X_orig = simulate_t(U0, S0, mu_fnc, nu_fnc, T)
+    S_orig, E_orig, U_orig, X_orig = simulate_t(U0, S0, mu_fnc, nu_fnc, T, rng)
 
     S = S_orig; E = E_orig
 
-    d = S[1:] - S[:-1] + E[1:] - E[:-1]     # discoveries at each timestep
-    psi = S[:-1] - (E[1:]-E[:-1])           # survivors at each timestep
-    extns = E[1:] - E[:-1]                  # extinctions at each timestep
-    T_idx = len(S)                          # number of timesteps
-    tV = list( reversed(range(1,T_idx)) )   # list of timesteps to work backwards through
-
-    # the minimum possible values of U_t are the number detected from t onwards + U_T
+    # the number of undetected species at the final timestep is known
     U_T = U_orig[-1]
-    min_poss_UV = [ U_T + sum(d[t-1:]) for t in range(1,T_idx) ]
 
 
     # do negs number of examples of sampling bounds back in time
     # ---
 
-    UV = list() # a place to store each of our examples
-
-    for egs in range(negs):
-
-        U = [0]*T_idx # a place to store this replicate
-        U[-1] = U_T
-        impossibleFlag = False
-
-        for t in tV:
-
-            S0 = S[t-1]; S1 = S[t]; U1 = U[t]; d0 = d[t-1]
-
-            # if type_of_ci == 'midp':
-            alpha = stats.uniform.rvs()
-            min_poss_U0 = max( ( min_poss_UV[t-1], U1+d0 ) )
-            U[t-1], impossibleFlag = find_U0_bnd(alpha, S0, S1, U1, d0, impossibleFlag, None, None)
-
-        # store this example
-        UV.append(U)
+    UM, _ = classical_replicates(S, E, U_T, negs, None, rng)
+    UV = [ list(U) for U in UM ] # each of our examples
 
 
     # plot them
@@ -2,17 +2,22 @@
 # double check that the old inverse_midp function worked okay for our
 # data, despite the mistake regarding impossible values
 
+import sys
+sys.path.insert(0,'../../undetected_extinctions') # so I can import the undetected extinctions package
+
 import csv
 import matplotlib.pyplot as plt
 import pickle
 import numpy as np
 
+from undetected_extinctions import read_classical, classical_fields
+
 
 # where are the results stored
 # ---
 
 fname_mcmc = '../../results/mcmc/mcmc_basic_result.csv'
-fname_classical = '../../results/classical/classical_basic_result.csv'
+fname_classical = '../../results/classical/classical_basic_result' # .npz if there is one, otherwise .csv
 
 
 # read in both
@@ -24,11 +29,9 @@ header = next(csv_f)
 m_res = [ [ float(ri) for ri in row ] for row in csv_f ]
 
 # classical results
-csv_f = csv.reader( open(fname_classical) )
-header = next(csv_f)
-c_res = [ [ float(ri) for ri in row ] for row in csv_f ]
+c_res = read_classical(fname_classical)
 
-years_mod, S, E, c_U_means, c_X_means, c_U_los, c_U_his, c_X_los, c_X_his = zip(* c_res )
+years_mod, S, E, c_U_means, c_X_means, c_U_los, c_U_his, c_X_los, c_X_his = [ c_res[field] for field in classical_fields ]
 _, _, _, m_U_means, m_X_means, m_U_los, m_U_his, m_X_los, m_X_his = zip(* m_res )
 
 
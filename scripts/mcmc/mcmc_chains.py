@@ -0,0 +1,52 @@
+# run several mcmc chains at once, from low, high and random starts, or continue them
+
+import sys
+sys.path.insert(0,'../..') # allows us to import undetected extinctions package
+
+import csv
+
+from undetected_extinctions.undetected_extinctions import frst_last_changed_E, get_SE
+from undetected_extinctions.mcmc.mcmc import run_chains
+
+
+# parameters
+# ---
+
+U_T = 0 # assume that at the final timestep there are no undetected species remaining
+nchains = 4 # how many chains
+nreps = 900000 # the total length of each chain; run again with a larger nreps to continue the chains
+starts = None # None, to cycle through 'lo', 'hi', 'random' starts, or a list with the start type of each chain
+seed = None # set to an integer to make the chains reproducible
+nworkers = None # number of worker processes, default the number of CPUs
+resume = True # continue the chains already in the store
+
+
+# where databases are
+# ---
+
+fname_frstlast = '../../data/processed/first_last_detns_final.csv'
+dir_store = '../../results/mcmc/chains/' # each chain appends to its own file here, see mcmc_chains_results.py
+
+
+# get record of first and last observations
+# ---
+
+# read in data
+csv_f = csv.reader(open(fname_frstlast))
+header = next(csv_f)
+frst_last = [ ( int(row[1]), int(row[2]) ) for row in csv_f ]
+
+# modify record, so that we only take intervals where the number of detected extinct species E changes
+years_mod, frst_last_mod = frst_last_changed_E(frst_last)
+
+# calculate the S and E for the timeseries
+_, S, E = get_SE(frst_last_mod, years_mod)
+
+
+# run the chains
+# ---
+
+if __name__ == '__main__':
+
+    nrowsV = run_chains(S, E, U_T, nchains, nreps, dir_store, starts, seed, nworkers, resume=resume)
+    print('chain lengths: ' + str(nrowsV))
@@ -0,0 +1,87 @@
+# check the convergence of the chains in the store, which may still be running, and obtain the basic results
+
+import sys
+sys.path.insert(0,'../..') # allows us to import undetected extinctions package
+
+import csv
+import numpy as np
+
+from undetected_extinctions.undetected_extinctions import frst_last_changed_E, get_SE
+from undetected_extinctions.mcmc.mcmc import read_chains, gelman_rubin
+
+
+# parameters
+# ---
+
+burnin = 15000 # discard the first 15000 iterations as burn in
+percentile = 95 # CI that I want
+GR_threshold = 1.1 # the chains are taken to have converged when every R-hat is below this
+
+
+# location of chains and info
+# ---
+
+fname_frstlast = '../../data/processed/first_last_detns_final.csv'
+dir_results = '../../results/mcmc/'
+dir_store = '../../results/mcmc/chains/'
+
+
+# get record of first and last observations
+# ---
+
+# read in data
+csv_f = csv.reader(open(fname_frstlast))
+header = next(csv_f)
+frst_last = [ ( int(row[1]), int(row[2]) ) for row in csv_f ]
+
+# modify record, so that we only take intervals where the number of detected extinct species E changes
+years_mod, frst_last_mod = frst_last_changed_E(frst_last)
+
+# calculate the S and E for the timeseries
+_, S, E = get_SE(frst_last_mod, years_mod)
+
+
+# obtain the chains so far, minus the burn-in, and check convergence
+# ---
+
+UVL = read_chains(dir_store, burnin)
+print('chain lengths after burn in: ' + str([ len(UV) for UV in UVL ]))
+
+# take log to correct for deviation from normal, as in convergence_check.py
+RV = gelman_rubin([ np.log(UV[:,:-1]) for UV in UVL ])
+print('largest R-hat: ' + str(np.max(RV)) + ', for U_0: ' + str(RV[0]))
+
+if np.max(RV) >= GR_threshold:
+    print('the chains have not converged yet')
+
+
+# calculate X_t using U_t, and statistics on the combined chains
+# ---
+
+UV = np.concatenate(UVL, axis=0)
+
+N = S[0]+E[0]+UV[:,0] # assumes X(0) = 0
+XV = N[:,None] - E[None,:] - S[None,:] - UV
+
+X_mean = np.mean(XV, axis=0)
+U_mean = np.mean(UV, axis=0)
+
+X_lo = np.percentile(XV, (100-percentile)/2,       axis=0)
+X_hi = np.percentile(XV, 100 - (100-percentile)/2, axis=0)
+
+U_lo = np.percentile(UV, (100-percentile)/2,       axis=0)
+U_hi = np.percentile(UV, 100 - (100-percentile)/2, axis=0)
+
+
+# store statistics to csv file
+# ---
+
+f = open(dir_results + 'mcmc_chains_result.csv', 'w')
+f.write('year,S,E,U_mean,X_mean,U_lo,U_hi,X_lo,X_hi\n')
+
+for row in zip(years_mod,S, E, U_mean, X_mean, U_lo, U_hi, X_lo, X_hi):
+    row_string = list(map( lambda v: str(v), row ))
+    f.write(','.join(row_string))
+    f.write('\n')
+
+f.close()
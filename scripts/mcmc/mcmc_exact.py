@@ -0,0 +1,78 @@
+# draw independent samples from the posterior exactly, instead of running MCMC chains,
+# and obtain the basic results, the 95-percentiles
+
+import sys
+sys.path.insert(0,'../..') # allows us to import undetected extinctions package
+
+import csv
+import numpy as np
+
+from undetected_extinctions.undetected_extinctions import frst_last_changed_E, get_SE
+from undetected_extinctions.mcmc.mcmc import sample_posterior
+
+
+# parameters
+# ---
+
+U_T = 0 # assume that at the final timestep there are no undetected species remaining
+nsamples = 100000 # how many independent samples to draw
+seed = None # set to an integer to make the samples reproducible
+percentile = 95 # CI that I want
+
+
+# where databases are
+# ---
+
+fname_frstlast = '../../data/processed/first_last_detns_final.csv'
+dir_results = '../../results/mcmc/'
+
+
+# get record of first and last observations
+# ---
+
+# read in data
+csv_f = csv.reader(open(fname_frstlast))
+header = next(csv_f)
+frst_last = [ ( int(row[1]), int(row[2]) ) for row in csv_f ]
+
+# modify record, so that we only take intervals where the number of detected extinct species E changes
+years_mod, frst_last_mod = frst_last_changed_E(frst_last)
+
+# calculate the S and E for the timeseries
+_, S, E = get_SE(frst_last_mod, years_mod)
+
+
+# sample U, and calculate X_t using U_t
+# ---
+
+UV = sample_posterior(S, E, U_T, nsamples, seed)
+
+N = S[0]+E[0]+UV[:,0] # assumes X(0) = 0
+XV = N[:,None] - E[None,:] - S[None,:] - UV
+
+
+# calculate statistics on sample
+# ---
+
+X_mean = np.mean(XV, axis=0)
+U_mean = np.mean(UV, axis=0)
+
+X_lo = np.percentile(XV, (100-percentile)/2,       axis=0)
+X_hi = np.percentile(XV, 100 - (100-percentile)/2, axis=0)
+
+U_lo = np.percentile(UV, (100-percentile)/2,       axis=0)
+U_hi = np.percentile(UV, 100 - (100-percentile)/2, axis=0)
+
+
+# store statistics to csv file
+# ---
+
+f = open(dir_results + 'mcmc_exact_result.csv', 'w')
+f.write('year,S,E,U_mean,X_mean,U_lo,U_hi,X_lo,X_hi\n')
+
+for row in zip(years_mod,S, E, U_mean, X_mean, U_lo, U_hi, X_lo, X_hi):
+    row_string = list(map( lambda v: str(v), row ))
+    f.write(','.join(row_string))
+    f.write('\n')
+
+f.close()
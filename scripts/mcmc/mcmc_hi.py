@@ -10,6 +10,7 @@ import random as random
 import pickle
 
 from undetected_extinctions.undetected_extinctions import frst_last_changed_E, get_SE
+from undetected_extinctions.mcmc.mcmc import U0Sampler
 
 
 # parameters
@@ -68,6 +69,10 @@ fnc_Ptt = lambda phi_t, t: hypergeom.pmf( phi_t, U[t]+S[t], U[t], phi_t + psi[t]
 # P(phi_{t+1} | phi_t) a likelihood
 fnc_P1t = lambda phi_t, t: hypergeom.pmf( phi[t+1], phi_t-d[t]+S[t+1], phi_t-d[t], phi[t+1]+psi[t+1])
 
+# P(U_0 | phi_0), the same draws as accumulating hypergeom.pmf( phi[0], S[0] + phi[0] + u, phi[0] + u, S[1] + U[1] ) / norm_L
+# over u = 0, 1, 2, ... until it passes r
+U0_sampler = U0Sampler( S[0], psi[0] )
+
 
 # initialise
 # ---
@@ -114,22 +119,10 @@ for rep in range(nreps):
     # update U_0 using the backwards sampling
     # ---
 
-    # call u_0 = U_0 − phi_0 and sample u_0
-
-    norm_L = S[0] * ( phi[0]+psi[0] ) / ( psi[0]*(psi[0]-1) )
+    # call u_0 = U_0 − phi_0 and sample u_0, by binary search of the cumulative distribution stored for this phi_0
 
     r = uniform.rvs() # choose our random number
-    cum_normed = 0 # initialise
-    u = 0
-    while cum_normed < r:
-
-        # step forward
-        L = hypergeom.pmf( phi[0], S[0] + phi[0] + u, phi[0] + u, S[1] + U[1] )
-        cum_normed += L/norm_L
-        u += 1
-
-    u -= 1
-    U[0] = phi[0]+u
+    U[0] = U0_sampler.sample( phi[0], S[1] + U[1], r )
 
 
     # update each subsequent phi_0... and U_1... using the conditionals
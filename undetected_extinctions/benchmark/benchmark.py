@@ -0,0 +1,226 @@
+import json
+import time
+import platform
+import tracemalloc
+
+import numpy as np
+import scipy
+
+from undetected_extinctions.undetected_extinctions import find_U0_bnd, inverse_midp, classical_replicates
+
+
+# the synthetic regimes: name, S0, S1, U1, d0, impossibleFlag
+synthetic_regimes = [
+        ('small S0, U1 = 0',            50,   45,   0,    2,   False),
+        ('small S0, small U1',          50,   45,   5,    2,   False),
+        ('large S0, small U1',          1500, 1490, 10,   5,   False),
+        ('large S0, large U1',          1500, 1490, 500,  5,   False),
+        ('small S0, very large U1',     200,  220,  2000, 40,  False),
+        ('large d0',                    300,  500,  50,   250, False),
+        ('impossible region',           1500, 1400, 0,    0,   False),
+        ('already impossible',          1500, 1400, 0,    0,   True),
+        ]
+
+def get_regimes(omegaV=[None, 0.172, 0.5]):
+    '''
+    regimes = get_regimes(omegaV=[None, 0.172, 0.5])
+
+    Returns the grid of synthetic regimes to benchmark, i.e. each of synthetic_regimes
+    for each value of omega
+
+    omegaV:
+        list of floats, values of omega, where None is the central hypergeometric variant
+    regimes:
+        list of dictionaries with keys name, S0, S1, U1, d0, impossibleFlag, omega
+    '''
+
+    regimes = [ { 'name': name, 'S0': S0, 'S1': S1, 'U1': U1, 'd0': d0, 'impossibleFlag': impossibleFlag, 'omega': omega }
+            for omega in omegaV for name, S0, S1, U1, d0, impossibleFlag in synthetic_regimes ]
+
+    return regimes
+
+def get_data_regimes(S, E, U_T=0, omega=None, every=10):
+    '''
+    regimes = get_data_regimes(S, E, U_T=0, omega=None, every=10)
+
+    Returns regimes from a real record, one per timestep (every every'th timestep), where U1 is taken
+    from a median replicate, i.e. one worked backwards with confidence level 0.5 at each timestep
+
+    S, E:
+        numpy arrays of integers, the number of detected extant and extinct species at each timestep
+    U_T:
+        integer, the number of undetected extant species at the final timestep
+    omega:
+        float, the omega of the regimes and the median replicate
+    every:
+        integer, take every every'th timestep
+    regimes:
+        list of dictionaries, as returned by get_regimes
+    '''
+
+    d = S[1:] - S[:-1] + E[1:] - E[:-1]     # discoveries at each timestep
+    T_idx = len(S)                          # number of timesteps
+
+    # a typical path of U, from the median confidence level at every timestep
+    UM, _ = classical_replicates(S, E, U_T, 1, omega, alphaM=np.full((1, T_idx-1), 0.5))
+    U = UM[0]
+
+    regimes = [ { 'name': 'data t = ' + str(t), 'S0': int(S[t-1]), 'S1': int(S[t]), 'U1': int(U[t]), 'd0': int(d[t-1]), 'impossibleFlag': False, 'omega': omega }
+            for t in range(T_idx-1, 0, -every) ]
+
+    return regimes
+
+def time_regime(regime, fnc_name='find_U0_bnd', ncalls=200, seed=0):
+    '''
+    result = time_regime(regime, fnc_name='find_U0_bnd', ncalls=200, seed=0)
+
+    Times one of the inversion functions on one regime, calling it for ncalls random confidence levels
+
+    regime:
+        dictionary, as returned by get_regimes
+    fnc_name:
+        string, 'find_U0_bnd', 'find_U0_bnd_secant' (find_U0_bnd with method = 'secant') or 'inverse_midp'
+    ncalls:
+        integer, how many calls to time
+    seed:
+        integer, seed for the confidence levels, so that runs can be compared
+    result:
+        dictionary, the regime plus fnc, ncalls, seconds, calls_per_sec, midP_evals_per_call,
+        secant_steps_per_call (zero but for find_U0_bnd_secant), and peak_memory_kB (the peak
+        memory allocated during the calls, from tracemalloc)
+    '''
+
+    S0 = regime['S0']; S1 = regime['S1']; U1 = regime['U1']; d0 = regime['d0']; omega = regime['omega']
+    alphaV = np.random.default_rng(seed).random(ncalls)
+    stats = dict()
+
+    if fnc_name == 'find_U0_bnd':
+        call = lambda alpha: find_U0_bnd(alpha, S0, S1, U1, d0, regime['impossibleFlag'], omega, stats=stats)
+    elif fnc_name == 'find_U0_bnd_secant':
+        call = lambda alpha: find_U0_bnd(alpha, S0, S1, U1, d0, regime['impossibleFlag'], omega, stats=stats, method='secant')
+    elif fnc_name == 'inverse_midp':
+        call = lambda alpha: inverse_midp(alpha, U1+d0, S0, S1, U1, d0, omega, stats=stats)
+    else:
+        raise ValueError('unknown function: ' + str(fnc_name))
+
+    # time, then measure the memory in a separate pass, because tracemalloc slows things down
+
+    t0 = time.perf_counter()
+    for alpha in alphaV:
+        call(alpha)
+    seconds = time.perf_counter() - t0
+
+    tracemalloc.start()
+    for alpha in alphaV[:10]:
+        call(alpha)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = dict(regime)
+    result.update({
+        'fnc': fnc_name,
+        'ncalls': ncalls,
+        'seconds': seconds,
+        'calls_per_sec': ncalls / seconds,
+        'midP_evals_per_call': stats['midP_evals'] / ncalls,
+        'secant_steps_per_call': stats.get('secant_steps', 0) / ncalls,
+        'peak_memory_kB': peak / 1024,
+        })
+
+    return result
+
+def time_classical(S, E, U_T=0, nreps=1000, omega=None, seed=0, sampler='mc'):
+    '''
+    result = time_classical(S, E, U_T=0, nreps=1000, omega=None, seed=0, sampler='mc')
+
+    Times a whole run of classical_replicates on a record, reporting the time spent drawing the
+    confidence levels separately from the total
+
+    result:
+        dictionary with keys nreps, omega, sampler, seconds, rng_seconds, reps_per_sec, and
+        midP_evals_per_rep (the number of mid-P evaluations per replicate, over all timesteps)
+    '''
+
+    stats = dict()
+
+    t0 = time.perf_counter()
+    classical_replicates(S, E, U_T, nreps, omega, seed, sampler=sampler, stats=stats)
+    seconds = time.perf_counter() - t0
+
+    result = {
+        'nreps': nreps,
+        'omega': omega,
+        'sampler': sampler,
+        'seconds': seconds,
+        'rng_seconds': stats['rng_seconds'],
+        'reps_per_sec': nreps / seconds,
+        'midP_evals_per_rep': stats['midP_evals'] / nreps,
+        }
+
+    return result
+
+def run_benchmark(regimes, fnc_names=['find_U0_bnd', 'find_U0_bnd_secant', 'inverse_midp'], ncalls=200, seed=0, verbose=True):
+    '''
+    results = run_benchmark(regimes, fnc_names=['find_U0_bnd', 'find_U0_bnd_secant', 'inverse_midp'], ncalls=200, seed=0, verbose=True)
+
+    Times each function in fnc_names on each regime, see time_regime
+
+    results:
+        dictionary with keys 'meta' (versions and platform, so that runs can be compared)
+        and 'results' (list of dictionaries returned by time_regime)
+    '''
+
+    meta = {
+            'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'scipy': scipy.__version__,
+            'platform': platform.platform(),
+            'ncalls': ncalls,
+            'seed': seed,
+            }
+
+    resultsV = list()
+    for regime in regimes:
+        for fnc_name in fnc_names:
+
+            result = time_regime(regime, fnc_name, ncalls, seed)
+            resultsV.append(result)
+
+            if verbose:
+                print( '{:>20s} {:<28s} omega = {:<6s} {:10.1f} calls/sec {:6.1f} evals/call {:8.1f} kB'.format(
+                    fnc_name, result['name'], str(result['omega']), result['calls_per_sec'], result['midP_evals_per_call'], result['peak_memory_kB'] ) )
+
+    return { 'meta': meta, 'results': resultsV }
+
+def save_benchmark(results, fname):
+    '''
+    save_benchmark(results, fname)
+
+    Saves the results of run_benchmark to a JSON file
+    '''
+
+    f = open(fname, 'w')
+    json.dump(results, f, indent=1)
+    f.close()
+
+def compare_benchmarks(fname_old, fname_new):
+    '''
+    comparison = compare_benchmarks(fname_old, fname_new)
+
+    Compares two saved benchmark runs, matching results by function, regime name and omega
+
+    comparison:
+        list of tuples (fnc, name, omega, speedup), where speedup is the ratio of calls/sec new / old
+    '''
+
+    resultsV = list()
+    for fname in [fname_old, fname_new]:
+        f = open(fname)
+        resultsV.append( { ( r['fnc'], r['name'], r['omega'] ): r for r in json.load(f)['results'] } )
+        f.close()
+
+    old, new = resultsV
+    comparison = [ key + ( new[key]['calls_per_sec'] / old[key]['calls_per_sec'], ) for key in new if key in old ]
+
+    return comparison
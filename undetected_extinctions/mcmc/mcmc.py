@@ -0,0 +1,580 @@
+import os
+import numpy as np
+from scipy.stats import hypergeom
+from scipy.special import gammaln, logsumexp
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from undetected_extinctions.undetected_extinctions import save_checkpoint, load_checkpoint, resume_checkpoint
+
+
+# the Bayesian SEUX model
+# ---
+#
+# With phi_t = U_{t+1} + d_t the undetected species surviving from timestep t to t+1, the posterior
+# of U_0, ..., U_{T-1} given U_T is, with a flat prior on U_0, proportional to the product over t of
+#
+#   g_t(U_t, U_{t+1}) = hypergeom.pmf( phi_t, U_t + S_t, U_t, phi_t + psi_t )
+#
+# i.e. the hidden U form a Markov chain and each g_t couples only neighbouring timesteps.
+# This is the target of the Metropolis-within-Gibbs sampler in scripts/mcmc/mcmc_hi.py
+
+def get_SEUX_params(S, E, U_T=0):
+    '''
+    d, psi, U_min = get_SEUX_params(S, E, U_T=0)
+
+    The quantities of the time series used by the posterior of the SEUX model
+
+    S, E:
+        numpy arrays of integers, the number of detected extant and extinct species at each timestep,
+        e.g. from get_SE
+    U_T:
+        integer, the number of undetected extant species at the final timestep
+    d:
+        numpy array of integers, the discoveries at each timestep
+    psi:
+        numpy array of integers, the detected species surviving each timestep
+    U_min:
+        numpy array of integers, the minimum possible number of undetected species at each timestep
+    '''
+
+    d = S[1:] - S[:-1] + E[1:] - E[:-1]     # discoveries at each timestep
+    psi = S[:-1] - (E[1:]-E[:-1])           # survivors at each timestep
+    U_min = np.append( U_T + np.cumsum(d[::-1])[::-1], U_T )
+
+    return d, psi, U_min
+
+def log_g(UV, U1V, S_t, d_t, psi_t):
+    '''
+    logGM = log_g(UV, U1V, S_t, d_t, psi_t)
+
+    The log of the factor g_t(U_t, U_{t+1}) of the posterior for every pair of U_t in UV and U_{t+1} in U1V,
+    up to a constant, and -inf where U_{t+1} + d_t > U_t
+
+    UV, U1V:
+        numpy arrays of integers, values of U_t and U_{t+1}
+    S_t, d_t, psi_t:
+        integers, the detected extant species, discoveries and detected survivors at timestep t
+    logGM:
+        numpy array of floats, shape (len(UV), len(U1V))
+    '''
+
+    aM = np.asarray(UV)[:,None]
+    kM = np.asarray(U1V)[None,:] + d_t  # phi_t
+
+    # hypergeom.pmf(k, a+S, a, k+psi) = C(a, k) C(S, psi) / C(a+S, k+psi), dropping C(S, psi)
+    with np.errstate(invalid='ignore'):
+        logGM = gammaln(aM+1) - gammaln(aM-kM+1) - gammaln(aM+S_t+1) + gammaln(aM-kM+S_t-psi_t+1) + gammaln(kM+psi_t+1) - gammaln(kM+1)
+
+    return np.where(kM <= aM, logGM, -np.inf)
+
+def get_posterior_messages(S, E, U_T=0, log_tail=40, chunk=64):
+    '''
+    loV, logbetaL = get_posterior_messages(S, E, U_T=0, log_tail=40, chunk=64)
+
+    The backward messages of the SEUX posterior, beta_t(U_t) = sum over U_{t+1} of g_t(U_t, U_{t+1}) beta_{t+1}(U_{t+1}),
+    i.e. the likelihood of the data after timestep t given U_t, computed in log space from beta_T = 1 at U_T.
+
+    Each message is computed on a truncated grid of consecutive U_t, starting at the smallest value reachable from
+    the grid of U_{t+1} and extended in chunks until the message has passed its peak and fallen log_tail below it.
+    The grid is then trimmed at both ends to where the message is within log_tail of its peak. Because the prior
+    on U_0 is flat, the posterior of U_0 is proportional to beta_0, so the truncation drops at most exp(-log_tail)
+    relative mass per value; at later timesteps it relies on the messages falling much faster than the mass
+    flowing in from earlier timesteps rises.
+
+    S, E, U_T:
+        as in get_SEUX_params
+    log_tail:
+        float, how far below its peak (in log units) the message is truncated
+    chunk:
+        integer, the number of values of U_t by which the grid is extended at a time
+    loV:
+        numpy array of integers, the smallest U_t in the grid of each timestep
+    logbetaL:
+        list of numpy arrays of floats, the log message over U_t = loV[t], loV[t]+1, ... at each timestep
+    '''
+
+    d, psi, _ = get_SEUX_params(S, E, U_T)
+    T = len(S) - 1
+
+    loV = np.zeros(T+1, dtype=int); logbetaL = [None]*(T+1)
+    loV[T] = U_T; logbetaL[T] = np.zeros(1)
+
+    for t in reversed(range(T)):
+
+        U1V = loV[t+1] + np.arange(len(logbetaL[t+1]))
+        lo = loV[t+1] + d[t]
+
+        # extend the grid until the message has peaked and fallen far enough
+        logbetaV = np.zeros(0)
+        while len(logbetaV) < 2 or logbetaV[-1] >= logbetaV[-2] or logbetaV[-1] > logbetaV.max() - log_tail:
+
+            UV = lo + len(logbetaV) + np.arange(chunk)
+            logbetaV = np.append( logbetaV, logsumexp(log_g(UV, U1V, S[t], d[t], psi[t]) + logbetaL[t+1][None,:], axis=1) )
+
+        # trim both ends
+        keepV = np.nonzero( logbetaV >= logbetaV.max() - log_tail )[0]
+        loV[t] = lo + keepV[0]
+        logbetaL[t] = logbetaV[keepV[0]:keepV[-1]+1]
+
+    return loV, logbetaL
+
+def sample_posterior(S, E, U_T=0, nsamples=1000, seed=None, messages=None, log_tail=40, batch_size=10000):
+    '''
+    UM = sample_posterior(S, E, U_T=0, nsamples=1000, seed=None, messages=None, log_tail=40, batch_size=10000)
+
+    Draws independent samples from the posterior of the SEUX model exactly (up to the truncation of the grid),
+    rather than by MCMC, so no burn-in, thinning or convergence checks are needed. The backward messages
+    (see get_posterior_messages) give the posterior of U_0 and, given U_t, the conditional posterior of U_{t+1}
+    is proportional to g_t(U_t, U_{t+1}) beta_{t+1}(U_{t+1}), so each sample is drawn forwards through the
+    time series. At each timestep, the conditional distribution is computed once for each distinct U_t
+    among the samples, and all the samples are drawn from them at once by inverting the cumulative distribution.
+
+    S, E, U_T:
+        as in get_SEUX_params
+    nsamples:
+        integer, the number of samples
+    seed:
+        integer, numpy.random.SeedSequence or numpy.random.Generator, the source of the random numbers
+    messages:
+        tuple (loV, logbetaL), optional, the output of get_posterior_messages, so it can be reused
+    log_tail:
+        float, passed to get_posterior_messages if messages aren't given
+    batch_size:
+        integer, the maximum number of samples drawn at once (limits the memory used)
+    UM:
+        numpy array of integers, shape (nsamples, T+1), the number of undetected extant species at each timestep
+        for each sample, as in the chains of scripts/mcmc/mcmc_hi.py
+    '''
+
+    d, psi, _ = get_SEUX_params(S, E, U_T)
+    T = len(S) - 1
+
+    rng = np.random.default_rng(seed)
+    loV, logbetaL = get_posterior_messages(S, E, U_T, log_tail) if messages is None else messages
+
+    # the posterior of U_0 is proportional to beta_0
+    cum0V = np.cumsum( np.exp(logbetaL[0] - logbetaL[0].max()) )
+
+    UM = np.zeros((nsamples, T+1), dtype=int)
+    for b in range(0, nsamples, batch_size):
+
+        n = min(batch_size, nsamples - b)
+        rM = rng.random((n, T+1))
+
+        UM[b:b+n,0] = loV[0] + np.searchsorted(cum0V, rM[:,0]*cum0V[-1], side='left')
+
+        for t in range(T):
+
+            # the conditional distribution of U_{t+1} for each distinct U_t
+            U1V = loV[t+1] + np.arange(len(logbetaL[t+1]))
+            UV, invV = np.unique(UM[b:b+n,t], return_inverse=True)
+            logWM = log_g(UV, U1V, S[t], d[t], psi[t]) + logbetaL[t+1][None,:]
+            cumM = np.cumsum( np.exp(logWM - logWM.max(axis=1)[:,None]), axis=1 )
+
+            # invert each sample's cumulative distribution
+            cumM = cumM[invV]
+            UM[b:b+n,t+1] = loV[t+1] + np.sum( cumM < rM[:,t+1:t+2]*cumM[:,-1:], axis=1 )
+
+    return UM
+
+class U0Sampler:
+    '''
+    sampler = U0Sampler(S0, psi0, chunk=256, max_tables=10000)
+
+    Draws U_0 from its conditional distribution given U_1, as the term-by-term loop in mcmc_hi.py does:
+    writing U_0 = phi_0 + u, the terms hypergeom.pmf( phi_0, S0 + phi_0 + u, phi_0 + u, S1 + U1 ) divided
+    by their known sum norm_L are accumulated over u = 0, 1, 2, ... until they reach the uniform draw r.
+
+    The conditional distribution depends only on phi_0 and S1 + U1, which take few values over a chain, so for
+    each key (phi_0, S1 + U1) the cumulative sums are stored, and U_0 is found by binary search. The terms are
+    evaluated in vectorised chunks, and a table is extended only when r falls beyond it. The table is
+    accumulated in the same order as the loop, so for the same r the result is identical. Tables are evicted in
+    least-recently-used order when there are more than max_tables.
+
+    S0:
+        integer, the number of detected extant species at the first timestep
+    psi0:
+        integer, the number of detected species surviving the first timestep
+    chunk:
+        integer, the number of terms a table is first built with
+    max_tables:
+        integer, the maximum number of tables stored
+
+    >>> sampler = U0Sampler(183, 177)
+    >>> sampler.sample(2000, 2177, 0.5) == sampler.sample(2000, 2177, 0.5)
+    True
+    '''
+
+    def __init__(self, S0, psi0, chunk=256, max_tables=10000):
+
+        self.S0 = S0; self.psi0 = psi0
+        self.chunk = chunk
+        self.max_tables = max_tables
+        self.tables = OrderedDict() # (phi0, S1 + U1) -> cumulative sums, ordered from least to most recently used
+
+    def _extend(self, key, cumV):
+
+        # the next terms of the cumulative sums, accumulated one after another as in the loop
+
+        phi0, SU1 = key
+        S0, psi0 = self.S0, self.psi0
+        norm_L = S0 * ( phi0+psi0 ) / ( psi0*(psi0-1) )
+
+        n = len(cumV)
+        uV = np.arange(n, n + max(n, self.chunk))
+        LV = hypergeom.pmf( phi0, S0 + phi0 + uV, phi0 + uV, SU1 )
+
+        if n == 0:
+            return np.cumsum( LV/norm_L )
+        return np.cumsum( np.concatenate(( cumV[-1:], LV/norm_L )) )[1:]
+
+    def sample(self, phi0, SU1, r):
+        '''
+        U0 = sampler.sample(phi0, SU1, r)
+
+        phi0:
+            integer, phi_0 = U_1 + d_0
+        SU1:
+            integer, S1 + U1
+        r:
+            float, the uniform random number
+        U0:
+            integer, the smallest phi0 + u whose cumulative sum reaches r
+        '''
+
+        key = (int(phi0), int(SU1))
+        cumV = self.tables.pop(key, np.zeros(0))
+
+        # extend until r is reached, or until the terms underflow
+        while len(cumV) == 0 or cumV[-1] < r:
+
+            n = len(cumV)
+            cumV = np.concatenate(( cumV, self._extend(key, cumV) ))
+            if n > 0 and cumV[-1] == cumV[n-1]:
+                break
+
+        self.tables[key] = cumV
+        if len(self.tables) > self.max_tables:
+            self.tables.popitem(last=False)
+
+        return int(phi0) + min(int(np.searchsorted(cumV, r, side='left')), len(cumV)-1)
+
+class GibbsSampler:
+    '''
+    sampler = GibbsSampler(S, E, U_T=0, seed=None, U_max=None)
+
+    The Metropolis-within-Gibbs sampler of scripts/mcmc/mcmc_hi.py, with each sweep done with array operations.
+
+    The log of each factor g_t is found by lookups in a table of log factorials, which is extended whenever a
+    larger U is reached, and the acceptance ratios are evaluated in log space, so they can't underflow.
+    Each U_t, 0 < t < T, is conditionally independent of the others given its neighbours U_{t-1} and U_{t+1},
+    so all the odd t are updated at once, and then all the even t. Each update proposes a value uniformly from
+    the range allowed by the neighbours, as in mcmc_hi.py, and U_0 is drawn from its conditional distribution with
+    a U0Sampler.
+
+    S, E, U_T:
+        as in get_SEUX_params
+    seed:
+        integer, numpy.random.SeedSequence or numpy.random.Generator, the source of the random numbers
+    U_max:
+        integer, the largest U the log-factorial table is initially built for (default twice the minimum U_0)
+    '''
+
+    def __init__(self, S, E, U_T=0, seed=None, U_max=None):
+
+        self.S = np.asarray(S); self.U_T = U_T
+        self.d, self.psi, self.U_min = get_SEUX_params(self.S, np.asarray(E), U_T)
+        self.T = len(S) - 1
+        self.rng = np.random.default_rng(seed)
+
+        # the blocks of U_t that are updated together
+        self.blocks = [ np.arange(1, self.T, 2), np.arange(2, self.T, 2) ]
+
+        self.lfV = np.zeros(0)
+        self._extend_table(2*self.U_min[0] if U_max is None else U_max)
+
+        self.U0_sampler = U0Sampler(self.S[0], self.psi[0])
+
+    def _extend_table(self, U_max):
+
+        # log factorials up to the largest argument used when U <= U_max
+        n = U_max + self.S.max() + 1
+        if n > len(self.lfV):
+            self.lfV = gammaln(np.arange(n) + 1)
+
+    def log_g(self, tV, UV, U1V):
+        '''
+        logGV = sampler.log_g(tV, UV, U1V)
+
+        The log of g_t(U_t, U_{t+1}), up to a constant for each t, elementwise for the timesteps tV
+
+        tV:
+            numpy array of integers, the timesteps
+        UV, U1V:
+            numpy arrays of integers, U_t and U_{t+1} at each of the timesteps
+        '''
+
+        lf = self.lfV
+        aV = UV; kV = U1V + self.d[tV]; SV = self.S[tV]; psiV = self.psi[tV]
+
+        # hypergeom.pmf(k, a+S, a, k+psi) = C(a, k) C(S, psi) / C(a+S, k+psi), dropping C(S, psi)
+        return lf[aV] - lf[kV] - lf[aV-kV] - lf[aV+SV] + lf[kV+psiV] + lf[aV+SV-kV-psiV]
+
+    def update_U0(self, U):
+        '''
+        sampler.update_U0(U)
+
+        Draws U_0 from its conditional distribution given U_1, in place, with the U0Sampler
+        '''
+
+        U[0] = self.U0_sampler.sample(U[1] + self.d[0], self.S[1] + U[1], self.rng.random())
+        self._extend_table(U[0])
+
+    def sweep(self, U):
+        '''
+        sampler.sweep(U)
+
+        One sweep of the sampler, updating U (a numpy array of integers of length T+1) in place
+        '''
+
+        self.update_U0(U)
+
+        for jV in self.blocks:
+
+            # propose from the range allowed by the neighbours
+            loV = U[jV+1] + self.d[jV]
+            hiV = U[jV-1] - self.d[jV-1]
+            newV = self.rng.integers(loV, hiV+1)
+
+            # log acceptance ratio of the two factors involving U_j
+            log_ratioV = self.log_g(jV-1, U[jV-1], newV) + self.log_g(jV, newV, U[jV+1]) \
+                    - self.log_g(jV-1, U[jV-1], U[jV]) - self.log_g(jV, U[jV], U[jV+1])
+
+            accept = self.rng.random(len(jV)) <= np.exp(log_ratioV)
+            U[jV[accept]] = newV[accept]
+
+    def run(self, U, nreps):
+        '''
+        UV = sampler.run(U, nreps)
+
+        Runs nreps sweeps from the state U (a numpy array of integers, which is updated in place) and returns
+        the state after each, a numpy array of integers of shape (nreps, T+1), as the chains of mcmc_hi.py
+        '''
+
+        self._extend_table(U.max())
+        UV = np.zeros((nreps, self.T+1), dtype=int)
+
+        for rep in range(nreps):
+            self.sweep(U)
+            UV[rep] = U
+
+        return UV
+
+
+# running several chains
+# ---
+
+# the types of starting point of a chain, which are given to the chains in turn by default
+start_types = [ 'lo', 'hi', 'random' ]
+
+def get_start(start_type, U_min, rng=None):
+    '''
+    U = get_start(start_type, U_min, rng=None)
+
+    The starting point of a chain: 'lo' the minimum possible U, 'hi' 1.5 times it, as in mcmc_lo.py and mcmc_hi.py,
+    or 'random' a random multiple between 1 and 2 of it. Any multiple of at least 1 is a possible state.
+
+    start_type:
+        string, 'lo', 'hi' or 'random'
+    U_min:
+        numpy array of integers, the minimum possible number of undetected species at each timestep (see get_SEUX_params)
+    rng:
+        numpy.random.Generator, the source of the random multiple
+    U:
+        numpy array of integers, the starting U, with the same U_T
+    '''
+
+    if start_type == 'lo':
+        c = 1
+    elif start_type == 'hi':
+        c = 1.5
+    elif start_type == 'random':
+        c = rng.uniform(1, 2)
+    else:
+        raise ValueError('unknown start_type ' + str(start_type))
+
+    U = (c*U_min).astype(int)
+    U[-1] = U_min[-1]
+
+    return U
+
+def _run_chain(args):
+
+    # Runs one chain of run_chains, appending its states to fname + '.bin' every flush_every sweeps
+    # and then checkpointing the chain, so it can be resumed where the file ends. Returns the chain's length
+
+    S, E, U_T, start_type, seed, nreps, fname, flush_every, resume = args
+
+    sampler = GibbsSampler(S, E, U_T, seed)
+    state = load_checkpoint(fname + '.ckpt') if resume else None
+
+    if state is None:
+
+        U = get_start(start_type, sampler.U_min, sampler.rng)
+        nrows = 0
+        f = open(fname + '.bin', 'wb')
+
+    else:
+
+        U = state['U']
+        nrows = state['nrows']
+        sampler.rng.bit_generator.state = state['rng_state']
+
+        # drop anything written after the checkpoint, which must all be there
+        nbytes = nrows * len(U) * 8
+        if not os.path.isfile(fname + '.bin') or os.path.getsize(fname + '.bin') < nbytes:
+            raise ValueError('chain file ' + fname + '.bin is shorter than its checkpoint of ' + str(nrows) + ' rows')
+
+        f = open(fname + '.bin', 'r+b')
+        f.truncate(nbytes)
+        f.seek(0, os.SEEK_END)
+
+    while nrows < nreps:
+
+        UV = sampler.run(U, min(flush_every, nreps - nrows))
+
+        f.write(UV.astype(np.int64).tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+
+        nrows += len(UV)
+        save_checkpoint(fname + '.ckpt', { 'U': U.copy(), 'nrows': nrows, 'rng_state': sampler.rng.bit_generator.state, 'start_type': start_type })
+
+    f.close()
+
+    return nrows
+
+def run_chains(S, E, U_T=0, nchains=4, nreps=150000, store='chains', starts=None, seed=None, nworkers=None, flush_every=1000, resume=True):
+    '''
+    nrowsV = run_chains(S, E, U_T=0, nchains=4, nreps=150000, store='chains', starts=None, seed=None, nworkers=None, flush_every=1000, resume=True)
+
+    Runs several chains of the GibbsSampler at once, in a pool of worker processes, from overdispersed starting
+    points (see get_start), each with its own random stream spawned from seed.
+
+    The chains share a store, a directory where each chain i appends its states to its own file, chain_i.bin
+    (int64 rows of U_0, ..., U_T), every flush_every sweeps, and then checkpoints its state and random stream
+    to chain_i.ckpt. The files only grow, so they can be read with read_chains while the chains are running,
+    e.g. to check convergence, and a run that is interrupted, or run again with a larger nreps, continues each
+    chain exactly where its checkpoint left off.
+
+    S, E, U_T:
+        as in get_SEUX_params
+    nchains:
+        integer, the number of chains
+    nreps:
+        integer, the total number of sweeps of each chain
+    store:
+        string, the directory of the store
+    starts:
+        list of strings, the start_type of each chain (default the start_types in turn)
+    seed:
+        integer or numpy.random.SeedSequence, the root of the chains' random streams
+    nworkers:
+        integer, the number of worker processes, default the number of CPUs
+    flush_every:
+        integer, the number of sweeps between writes to the store
+    resume:
+        boolean, continue the chains in the store, which must have been started with the same parameters and seed
+    nrowsV:
+        list of integers, the length of each chain
+    '''
+
+    if starts is None:
+        starts = [ start_types[i % len(start_types)] for i in range(nchains) ]
+    if nworkers is None:
+        nworkers = os.cpu_count()
+
+    os.makedirs(store, exist_ok=True)
+    fname_store = os.path.join(store, 'chains.ckpt')
+
+    # the same root seed as when the store was started, so chains without a checkpoint get the same streams
+    params = { 'S': list(map(int, S)), 'E': list(map(int, E)), 'U_T': U_T, 'nchains': nchains, 'starts': list(starts),
+            'seed': ( seed.entropy, tuple(seed.spawn_key) ) if isinstance(seed, np.random.SeedSequence) else seed }
+    state, seed = resume_checkpoint(fname_store, resume, params, seed)
+    if state is None:
+
+        # drop the chains' checkpoints from any earlier run in the store, otherwise a chain that this run is
+        # interrupted before flushing would be resumed from one of them
+        for fname in os.listdir(store):
+            if fname.startswith('chain_') and fname.endswith('.ckpt'):
+                os.remove(os.path.join(store, fname))
+
+        save_checkpoint(fname_store, { 'params': params, 'entropy': seed.entropy, 'spawn_key': seed.spawn_key, 'n_children_spawned': seed.n_children_spawned })
+
+    seedV = seed.spawn(nchains)
+    argsV = [ ( S, E, U_T, start_type, chain_seed, nreps, os.path.join(store, 'chain_' + str(i)), flush_every, resume )
+            for i, (start_type, chain_seed) in enumerate(zip(starts, seedV)) ]
+
+    if nworkers == 1:
+
+        nrowsV = list(map(_run_chain, argsV))
+
+    else:
+
+        with ProcessPoolExecutor(max_workers=nworkers) as executor:
+            nrowsV = list(executor.map(_run_chain, argsV))
+
+    return nrowsV
+
+def read_chains(store, burnin=0):
+    '''
+    UVL = read_chains(store, burnin=0)
+
+    Reads the chains written to a store by run_chains, which may still be running. Only complete rows are read,
+    so each chain is as long as it was when it was last flushed, or longer.
+
+    store:
+        string, the directory of the store
+    burnin:
+        integer, the number of sweeps to discard from the start of each chain
+    UVL:
+        list of numpy arrays of integers, shape (nreps, T+1), the states of each chain
+    '''
+
+    params = load_checkpoint(os.path.join(store, 'chains.ckpt'))['params']
+    T_idx = len(params['S'])
+
+    UVL = list()
+    for i in range(params['nchains']):
+
+        fname = os.path.join(store, 'chain_' + str(i) + '.bin')
+        UV = np.fromfile(fname, dtype=np.int64) if os.path.isfile(fname) else np.zeros(0, dtype=np.int64)
+        nrows = len(UV) // T_idx
+        UVL.append( UV[:nrows*T_idx].reshape(nrows, T_idx)[burnin:] )
+
+    return UVL
+
+def gelman_rubin(UVL):
+    '''
+    RV = gelman_rubin(UVL)
+
+    The Gelman-Rubin potential scale reduction factor of each variable, over the chains truncated to the same length.
+    Values near 1 suggest the chains have converged; nan where a variable is constant.
+
+    UVL:
+        list of numpy arrays, shape (nreps, nvars), the chains, e.g. from read_chains
+    RV:
+        numpy array of floats, the factor for each variable
+    '''
+
+    n = min( len(UV) for UV in UVL )
+    XM = np.array([ UV[:n] for UV in UVL ], dtype=float)  # chains, sweeps, variables
+
+    W = np.mean( np.var(XM, axis=1, ddof=1), axis=0 )   # within-chain variance
+    B = n * np.var( np.mean(XM, axis=1), axis=0, ddof=1 )  # between-chain variance
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        RV = np.sqrt( ((n-1)/n * W + B/n) / W )
+
+    return RV
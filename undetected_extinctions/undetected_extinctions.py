@@ -1,9 +1,22 @@
 # 
 
+import os
+import csv
+import json
+import hashlib
+import pickle
+import time
+import logging
 import numpy as np
-from scipy.stats import hypergeom
+from scipy.stats import hypergeom, qmc
 from itertools import compress
+from collections import OrderedDict
 from scipy.special import logit
+from scipy import sparse
+from concurrent.futures import ProcessPoolExecutor
+
+
+logger = logging.getLogger(__name__)
 
 
 def frst_last_changed_E(frst_last):
@@ -157,9 +170,724 @@ def get_SE(frst_last, years=None):
 
     return years, S, E
 
-def find_U0_bnd(alpha, S0, S1, U1, d0, impossibleFlag=False, omega=None, biasedurn=None):
+def _hypergeom_tail(U0, S0, S1, U1, d0, omega=None):
+
+    # Returns F(x-1), P(X = x) and P(X = x-1) as flat arrays, where X is the central hypergeometric number
+    # of undetected survivors, x = U1+d0, and F is its cdf. See midP_central. When omega is given,
+    # X has the Fisher non-central hypergeometric distribution with odds ratio omega instead.
+
+    shape = np.broadcast(U0, S0, S1, U1, d0, 1.0 if omega is None else omega).shape
+    U0, S0, S1, U1, d0 = [ np.broadcast_to(np.asarray(v, dtype=int), shape).ravel() for v in (U0, S0, S1, U1, d0) ]
+
+    # population of S0+U0 species, of which U0 are undetected, and S1+U1 survive; X is the number of undetected survivors
+
+    N = S1 + U1
+    x = U1 + d0
+
+    k_lo = np.maximum(0, N - S0)    # support of X
+    k_hi = np.minimum(N, U0)
+    L = k_hi - k_lo + 1             # length of the support
+    invalid = (L < 1) | (U0 < 0) | (S0 < 0)
+    L[invalid] = 1
+
+    # log of the ratio P(X = k+1) / P(X = k) for k = k_lo, ..., k_hi-1
+
+    j = np.arange(L.max(initial=1))[None,:]
+    k = k_lo[:,None] + j
+    has_next = j < (L-1)[:,None]
+
+    numer = np.where(has_next, (U0[:,None]-k) * (N[:,None]-k), 1) # ones where we don't need the ratio
+    denom = np.where(has_next, (k+1) * (S0[:,None]-N[:,None]+k+1), 1)
+    logr = np.log(numer) - np.log(denom)
+
+    # the mode of the distribution
+
+    if omega is None:
+
+        mode = ( (U0+1)*(N+1) ) // ( S0+U0+2 )
+        mode = np.clip(mode, k_lo, k_hi) - k_lo
+
+    else:
+
+        # each term is weighted by omega^k, and the ratios decrease with k, so the mode is where they fall below 1
+        logr = np.where(has_next, logr + np.log( np.broadcast_to(omega, shape).ravel() )[:,None], 0)
+        mode = np.count_nonzero(logr > 0, axis=1)
+
+    # log P(X = k) - log P(X = mode), summing the ratios outwards from the mode in each direction
+
+    up = np.cumsum( np.where(j >= mode[:,None], logr, 0), axis=1 )
+    down = np.cumsum( np.where(j < mode[:,None], logr, 0)[:,::-1], axis=1 )[:,::-1]
+
+    logpmf = np.zeros(k.shape)
+    logpmf[:,1:] = up[:,:-1]
+    logpmf = np.where(j > mode[:,None], logpmf, -down)
+    logpmf[j == mode[:,None]] = 0
+
+    # sum the pmf over the lower tail and normalise by the sum over the support; the sums are sequential
+    # (cumsum) so that the zero padding of the grid doesn't change the rounding, i.e. each element's
+    # result doesn't depend on what else is in the array
+
+    pmf = np.where(j < L[:,None], np.exp(logpmf), 0)
+    Z = np.cumsum(pmf, axis=1)[:,-1]
+
+    Fxm1 = np.cumsum( np.where(k < x[:,None], pmf, 0), axis=1 )[:,-1] / Z
+    px = np.sum( np.where(k == x[:,None], pmf, 0), axis=1 ) / Z
+    pxm1 = np.sum( np.where(k == x[:,None]-1, pmf, 0), axis=1 ) / Z
+
+    Fxm1[invalid] = np.nan # not a valid hypergeometric distribution
+
+    return Fxm1, px, pxm1
+
+def _central_step(U0, Fxm1, px, pxm1, S0, S1, U1, d0, step):
+
+    # Steps the output of _hypergeom_tail from U0 to U0+step, where step is +1 or -1, using the recurrences
+    #   P(X = k | U0+1) = P(X = k | U0) * (U0+1) / (U0+1-k) * (S0+U0+1-N) / (S0+U0+1)
+    #   F(k | U0+1)     = F(k | U0) - P(X = k | U0) * (N-k) / (S0+U0+1)
+    # where N = S1+U1. Each update is O(1), rather than a sum over the support.
+
+    N = S1 + U1
+    x = U1 + d0
+
+    if step > 0:
+
+        ratio = lambda k: (U0+1) / (U0+1-k) * (S0+U0+1-N) / (S0+U0+1)
+        Fxm1 = Fxm1 - pxm1 * (N-x+1) / (S0+U0+1)
+        px = px * ratio(x)
+        pxm1 = pxm1 * ratio(x-1)
+
+    else:
+
+        inv_ratio = lambda k: (U0-k) / U0 * (S0+U0) / (S0+U0-N)
+        px = px * inv_ratio(x)
+        pxm1 = pxm1 * inv_ratio(x-1)
+        Fxm1 = Fxm1 + pxm1 * (N-x+1) / (S0+U0)
+
+    return Fxm1, px, pxm1
+
+def midP_central(U0, S0, S1, U1, d0):
+    '''
+    midPV = midP_central(U0, S0, S1, U1, d0)
+
+    The mid-P function for the central hypergeometric model, i.e.
+
+        0.5 * ( hypergeom.cdf( U1+d0, S0+U0, U0, S1+U1 ) + hypergeom.cdf( U1+d0-1, S0+U0, U0, S1+U1 ) )
+
+    computed directly from the hypergeometric pmf, which avoids the overhead of scipy's distribution
+    machinery. The log pmf is built up in log space from the ratios of successive terms, starting
+    from zero at the mode, so there is no cancellation between large log-factorials and the result
+    stays accurate for large S0+U0. The lower tail is then normalised by the sum over the whole
+    support. All arguments may be numpy arrays, which are broadcast.
+
+    U0:
+        integer, the number of undetected extant species at the previous timestep
+    S0, S1, U1, d0:
+        integers, as in find_U0_bnd
+    midPV:
+        float or numpy array of floats, the mid-P value(s)
+
+    >>> bool( abs( midP_central(20, 50, 45, 3, 2) - 0.5 * ( hypergeom.cdf(5, 70, 20, 48) + hypergeom.cdf(4, 70, 20, 48) ) ) < 1e-14 )
+    True
+    '''
+
+    shape = np.broadcast(U0, S0, S1, U1, d0).shape
+
+    Fxm1, px, _ = _hypergeom_tail(U0, S0, S1, U1, d0)
+    midPV = ( Fxm1 + 0.5*px ).reshape(shape)
+
+    return midPV if shape else midPV[()]
+
+def midP_central_range(U0_lo, U0_hi, S0, S1, U1, d0, anchor_every=64):
+    '''
+    midPV = midP_central_range(U0_lo, U0_hi, S0, S1, U1, d0, anchor_every=64)
+
+    Evaluates midP_central for every U0 in U0_lo, U0_lo+1, ..., U0_hi. Rather than summing over the
+    support for each U0, the tail is computed directly only at every anchor_every'th U0 (the anchors),
+    and in between it is updated from its neighbour using the recurrences of the hypergeometric pmf
+    in U0 (see _central_step), so a range of U0 costs O(range) rather than O(range x support).
+    Restarting at each anchor keeps the rounding error that accumulates through the updates small.
+
+    U0_lo, U0_hi:
+        integers, the range of U0, which should be >= U1+d0
+    S0, S1, U1, d0:
+        integers, as in find_U0_bnd
+    anchor_every:
+        integer, the number of U0 values between direct evaluations
+    midPV:
+        numpy array of floats, midP_central evaluated at each U0 in the range
+
+    >>> bool( np.allclose( midP_central_range(5, 300, 50, 45, 3, 2), midP_central(np.arange(5, 301), 50, 45, 3, 2), rtol=0, atol=1e-14 ) )
+    True
+    '''
+
+    N = S1 + U1
+    x = U1 + d0
+
+    # evaluate the anchors directly
+
+    U0_anchors = np.arange(U0_lo, U0_hi+1, anchor_every)
+    Fxm1, px, pxm1 = _hypergeom_tail(U0_anchors, S0, S1, U1, d0)
+
+    # step away from each anchor using the recurrence, with the anchors as rows and the steps as columns,
+    # P(X = k | anchor + i) = P(X = k | anchor) * cumulative product of the ratios
+
+    U0 = U0_anchors[:,None] + np.arange(anchor_every)[None,:]
+    fac = (S0+U0+1-N) / (S0+U0+1)
+
+    def cumprod_ratio(k):
+
+        r = np.ones(U0.shape)
+        r[:,1:] = ( (U0+1) / (U0+1-k) * fac )[:,:-1]
+        return np.cumprod(r, axis=1)
+
+    pxV = px[:,None] * cumprod_ratio(x)
+    pxm1V = pxm1[:,None] * cumprod_ratio(x-1)
+
+    dec = np.zeros(U0.shape)
+    dec[:,1:] = np.cumsum( pxm1V * (N-x+1) / (S0+U0+1), axis=1 )[:,:-1]
+    Fxm1V = Fxm1[:,None] - dec
+
+    midPV = ( Fxm1V + 0.5*pxV ).ravel()[:U0_hi-U0_lo+1]
+
+    return midPV
+
+class _CentralStepper:
+
+    # A mid-P function for the central model that remembers the tail at the last U0 evaluated for each element
+    # of a search, and when the next probe of that element is a neighbouring U0, it updates the tail in O(1)
+    # using _central_step instead of evaluating it from scratch. Used by find_U0_bnd and find_U0_bnd_batch.
+
+    def __init__(self, n, S0, S1, U1V, d0):
+
+        self.S0 = S0; self.S1 = S1; self.d0 = d0
+        self.U1V = np.broadcast_to(np.asarray(U1V, dtype=int), (n,))
+
+        self.U0 = np.full(n, -2)  # the last U0 probed for each element, -2 for none
+        self.Fxm1 = np.zeros(n)
+        self.px = np.zeros(n)
+        self.pxm1 = np.zeros(n)
+
+        self.nsteps = 0     # number of evaluations done by stepping
+        self.ndirect = 0    # number of evaluations done directly
+
+    def __call__(self, idxs, U0):
+
+        idxs = np.asarray(idxs); U0 = np.asarray(U0)
+        U1 = self.U1V[idxs]
+        Fxm1 = np.empty(len(idxs)); px = np.empty(len(idxs)); pxm1 = np.empty(len(idxs))
+
+        # evaluate directly where we don't have a neighbour
+
+        for step in [1, -1]:
+
+            sel = U0 - self.U0[idxs] == step
+            if np.any(sel):
+                ii = idxs[sel]
+                Fxm1[sel], px[sel], pxm1[sel] = _central_step(self.U0[ii], self.Fxm1[ii], self.px[ii], self.pxm1[ii], self.S0, self.S1, U1[sel], self.d0, step)
+                self.nsteps += int(np.count_nonzero(sel))
+
+        direct = np.abs(U0 - self.U0[idxs]) != 1
+        if np.any(direct):
+            Fxm1[direct], px[direct], pxm1[direct] = _hypergeom_tail(U0[direct], self.S0, self.S1, U1[direct], self.d0)
+            self.ndirect += int(np.count_nonzero(direct))
+
+        # store the state of the search
+
+        self.U0[idxs] = U0; self.Fxm1[idxs] = Fxm1; self.px[idxs] = px; self.pxm1[idxs] = pxm1
+
+        return Fxm1 + 0.5*px
+
+def midP_fisher(U0, S0, S1, U1, d0, omega):
+    '''
+    midPV = midP_fisher(U0, S0, S1, U1, d0, omega)
+
+    The mid-P function for the Fisher non-central hypergeometric model, i.e. the same as
+
+        0.5 * ( biasedurn.pFNCHypergeo( U1+d0, U0, S0, S1+U1, omega ) + biasedurn.pFNCHypergeo( U1+d0-1, U0, S0, S1+U1, omega ) )
+
+    but computed natively in the same way as midP_central, so that the Fisher variant doesn't need R.
+    All arguments, including omega, may be numpy arrays, which are broadcast.
+
+    U0, S0, S1, U1, d0:
+        integers, as in midP_central
+    omega:
+        float, the odds ratio of survival in undetected / detected species
+    midPV:
+        float or numpy array of floats, the mid-P value(s)
+
+    >>> bool( np.allclose( midP_fisher(np.arange(5, 50), 50, 45, 3, 2, 1.0), midP_central(np.arange(5, 50), 50, 45, 3, 2), rtol=0, atol=1e-14 ) )
+    True
+    >>> bool( all( np.isclose( midP_fisher(U0, S0, S1, U1, d0, omega), midP, rtol=1e-10, atol=0 ) for U0, S0, S1, U1, d0, omega, midP in _midP_fisher_reference ) )
+    True
+    '''
+
+    shape = np.broadcast(U0, S0, S1, U1, d0, omega).shape
+
+    Fxm1, px, _ = _hypergeom_tail(U0, S0, S1, U1, d0, omega)
+    midPV = ( Fxm1 + 0.5*px ).reshape(shape)
+
+    return midPV if shape else midPV[()]
+
+def pFNCHypergeo(x, m1, m2, n, odds):
+    '''
+    P = pFNCHypergeo(x, m1, m2, n, odds)
+
+    The cumulative distribution function of Fisher's non-central hypergeometric distribution, with the
+    same arguments as the function of the same name in the R package BiasedUrn, computed natively.
+    All arguments may be numpy arrays, which are broadcast.
+
+    x:
+        integer, the number of balls of colour 1 taken
+    m1, m2:
+        integers, the initial numbers of balls of colour 1 and colour 2 in the urn
+    n:
+        integer, the number of balls taken
+    odds:
+        float, the odds ratio of taking a ball of colour 1 versus colour 2
+    P:
+        float or numpy array of floats, the probability of taking x or fewer balls of colour 1
+
+    >>> float(round( pFNCHypergeo(1, 2, 2, 2, 0.5), 12 )) # ( 1 + 2*0.5 ) / ( 1 + 2*0.5 + 0.5**2 )
+    0.923076923077
+    >>> bool( all( np.isclose( pFNCHypergeo(x, m1, m2, n, odds), P, rtol=1e-10, atol=0 ) for x, m1, m2, n, odds, P in _pFNCHypergeo_reference ) )
+    True
+    >>> from scipy.stats import nchypergeom_fisher
+    >>> xV = np.arange(300, 1801); bool( np.allclose( pFNCHypergeo(xV, 2000, 1500, 1800, 0.172), nchypergeom_fisher.cdf(xV, 3500, 2000, 1800, 0.172), rtol=0, atol=1e-10 ) )
+    True
+    '''
+
+    shape = np.broadcast(x, m1, m2, n, odds).shape
+
+    # in terms of _hypergeom_tail, U0 = m1, S0 = m2, S1+U1 = n, and U1+d0 = x
+
+    Fxm1, px, _ = _hypergeom_tail(m1, m2, n, 0, x, odds)
+    P = np.minimum( Fxm1 + px, 1 ).reshape(shape)
+
+    return P if shape else P[()]
+
+# reference values for the doctests of pFNCHypergeo and midP_fisher, computed exactly (to 40 digits, with mpmath)
+# by summing the weights C(m1, k) C(m2, n-k) odds^k: several odds, small and large urns, and x at and beyond
+# the ends of the support
+
+# x, m1, m2, n, odds, pFNCHypergeo
+_pFNCHypergeo_reference = [
+        ( -1, 2, 2, 2, 0.05, 0.0 ),
+        ( 0, 2, 2, 2, 0.05, 0.8316008316008316 ),
+        ( 1, 2, 2, 2, 0.05, 0.9979209979209979 ),
+        ( 2, 2, 2, 2, 0.05, 1.0 ),
+        ( -1, 30, 50, 40, 0.05, 0.0 ),
+        ( 0, 30, 50, 40, 0.05, 0.014554778382600752 ),
+        ( 15, 30, 50, 40, 0.05, 0.9999999999603431 ),
+        ( 30, 30, 50, 40, 0.05, 1.0 ),
+        ( 299, 2000, 1500, 1800, 0.05, 0.0 ),
+        ( 300, 2000, 1500, 1800, 0.05, 1.8708198654864312e-117 ),
+        ( 1050, 2000, 1500, 1800, 0.05, 1.0 ),
+        ( 1800, 2000, 1500, 1800, 0.05, 1.0 ),
+        ( -1, 2, 2, 2, 0.172, 0.0 ),
+        ( 0, 2, 2, 2, 0.172, 0.5822131552226849 ),
+        ( 1, 2, 2, 2, 0.172, 0.9827758060158921 ),
+        ( 2, 2, 2, 2, 0.172, 1.0 ),
+        ( -1, 30, 50, 40, 0.172, 0.0 ),
+        ( 0, 30, 50, 40, 0.172, 2.3527855196184383e-05 ),
+        ( 15, 30, 50, 40, 0.172, 0.999972922064304 ),
+        ( 30, 30, 50, 40, 0.172, 1.0 ),
+        ( 299, 2000, 1500, 1800, 0.172, 0.0 ),
+        ( 300, 2000, 1500, 1800, 0.172, 2.437856816532016e-268 ),
+        ( 1050, 2000, 1500, 1800, 0.172, 1.0 ),
+        ( 1800, 2000, 1500, 1800, 0.172, 1.0 ),
+        ( -1, 2, 2, 2, 1.0, 0.0 ),
+        ( 0, 2, 2, 2, 1.0, 0.16666666666666666 ),
+        ( 1, 2, 2, 2, 1.0, 0.8333333333333334 ),
+        ( 2, 2, 2, 2, 1.0, 1.0 ),
+        ( -1, 30, 50, 40, 1.0, 0.0 ),
+        ( 0, 30, 50, 40, 1.0, 9.554966863179975e-14 ),
+        ( 15, 30, 50, 40, 1.0, 0.5911962090884416 ),
+        ( 30, 30, 50, 40, 1.0, 1.0 ),
+        ( 299, 2000, 1500, 1800, 1.0, 0.0 ),
+        ( 300, 2000, 1500, 1800, 1.0, 0.0 ),
+        ( 1050, 2000, 1500, 1800, 1.0, 0.9330124155399565 ),
+        ( 1800, 2000, 1500, 1800, 1.0, 1.0 ),
+        ( -1, 2, 2, 2, 10.0, 0.0 ),
+        ( 0, 2, 2, 2, 10.0, 0.0070921985815602835 ),
+        ( 1, 2, 2, 2, 10.0, 0.2907801418439716 ),
+        ( 2, 2, 2, 2, 10.0, 1.0 ),
+        ( -1, 30, 50, 40, 10.0, 0.0 ),
+        ( 0, 30, 50, 40, 10.0, 7.095873264989523e-34 ),
+        ( 15, 30, 50, 40, 10.0, 1.4861102779444794e-06 ),
+        ( 30, 30, 50, 40, 10.0, 1.0 ),
+        ( 299, 2000, 1500, 1800, 10.0, 0.0 ),
+        ( 300, 2000, 1500, 1800, 10.0, 0.0 ),
+        ( 1050, 2000, 1500, 1800, 10.0, 2.76875784289384e-215 ),
+        ( 1800, 2000, 1500, 1800, 10.0, 1.0 ),
+        ]
+
+# U0, S0, S1, U1, d0, omega, midP_fisher
+_midP_fisher_reference = [
+        ( 5, 50, 45, 3, 2, 0.172, 0.9730145999530186 ),
+        ( 20, 50, 45, 3, 2, 0.172, 0.04511368156985739 ),
+        ( 2300, 183, 183, 2150, 6, 0.172, 0.9870044065517173 ),
+        ( 2156, 183, 183, 2150, 6, 0.172, 0.9999999999958868 ),
+        ( 1600, 1500, 1490, 500, 5, 0.172, 1.134119137915561e-125 ),
+        ( 2000, 200, 220, 1950, 40, 0.172, 1.0 ),
+        ( 5, 50, 45, 3, 2, 0.5, 0.8626350141512158 ),
+        ( 20, 50, 45, 3, 2, 0.5, 0.00021202269459790488 ),
+        ( 2300, 183, 183, 2150, 6, 0.5, 0.5370871289931266 ),
+        ( 2156, 183, 183, 2150, 6, 0.5, 0.9999999978904969 ),
+        ( 1600, 1500, 1490, 500, 5, 0.5, 1.528182060040138e-271 ),
+        ( 2000, 200, 220, 1950, 40, 0.5, 1.0 ),
+        ( 5, 50, 45, 3, 2, 2.0, 0.6560504012637602 ),
+        ( 20, 50, 45, 3, 2, 2.0, 1.102292072304807e-09 ),
+        ( 2300, 183, 183, 2150, 6, 2.0, 5.5104678565467995e-05 ),
+        ( 2156, 183, 183, 2150, 6, 2.0, 0.9999956710148536 ),
+        ( 1600, 1500, 1490, 500, 5, 2.0, 0.0 ),
+        ( 2000, 200, 220, 1950, 40, 2.0, 0.9999999996438776 ),
+        ]
+
+def get_midP_fnc(omega=None, biasedurn=None, backend='logspace'):
+    '''
+    midP_fnc = get_midP_fnc(omega=None, biasedurn=None, backend='logspace')
+
+    Returns the mid-P function used to find the bound on U0, i.e. the mid-P value of observing
+    U1+d0 or fewer undetected survivors given U0 undetected species at the previous timestep.
+
+    By default the model used is the central hypergeometric distribution. When omega is specified,
+    the Fisher non-central hypergeometric distribution is used instead.
+
+    omega:
+        float, the odds ratio of survival in undetected / detected species
+    biasedurn:
+        rpy2.robjects.packages.Package as a <module 'BiasedUrn'>, see find_U0_bnd. If omega is given but
+        biasedurn is None, the Fisher variant is computed natively using midP_fisher
+    backend:
+        string, how the central variant is computed: 'logspace' (default) uses midP_central, and
+        'scipy' uses scipy.stats.hypergeom.cdf, kept as a reference
+    midP_fnc:
+        function with arguments (U0, S0, S1, U1, d0). It accepts numpy arrays and broadcasts them;
+        the BiasedUrn variant evaluates arrays element by element
+    '''
+
+    if omega and biasedurn is None: # doing the Fisher variant natively
+
+        midP_fnc = lambda U0, S0, S1, U1, d0: midP_fisher(U0, S0, S1, U1, d0, omega)
+
+    elif omega: # doing the Fisher variant using BiasedUrn, kept as a reference
+
+        pFNC = lambda x, U0, S0, S1, U1: biasedurn.pFNCHypergeo( int(x), int(U0), int(S0), int(S1+U1), omega )[0]
+
+        def midP_fnc(U0, S0, S1, U1, d0):
+
+            if np.ndim(U0) == 0 and np.ndim(U1) == 0:
+
+                return 0.5 * ( pFNC( U1+d0, U0, S0, S1, U1 ) + pFNC( U1+d0-1, U0, S0, S1, U1 ) )
+
+            U0, U1 = np.broadcast_arrays(U0, U1)
+            return np.array([ 0.5 * ( pFNC( u1+d0, u0, S0, S1, u1 ) + pFNC( u1+d0-1, u0, S0, S1, u1 ) ) for u0, u1 in zip(U0.flat, U1.flat) ]).reshape(U0.shape)
+
+    elif backend == 'scipy': # central hypergeom, assumes equal probability of extinction
+
+        midP_fnc = lambda U0, S0, S1, U1, d0: 0.5 * ( hypergeom.cdf( U1+d0, S0+U0, U0, S1+U1 ) + hypergeom.cdf( U1+d0-1, S0+U0, U0, S1+U1 ) )
+
+    elif backend == 'logspace': # the same, but using our own log-space kernel
+
+        midP_fnc = midP_central
+
+    else:
+
+        raise ValueError('unknown mid-P backend: ' + str(backend))
+
+    return midP_fnc
+
+class MidPCache:
+    '''
+    cache = MidPCache(max_values=10000000)
+
+    A memoization layer for the mid-P function used by find_U0_bnd, find_U0_bnd_batch and inverse_midp.
+
+    For a given timestep, S0, S1 and d0 are fixed and U1 takes only a small set of values across
+    replicates, so the same mid-P values are needed again and again. The cache stores, for each key
+    (S0, S1, U1, d0, omega), the curve of mid-P values over U0 as a numpy array starting at the
+    minimum possible U0 = U1+d0 (unevaluated entries are nan). Curves are evicted in least-recently-used
+    order when the total number of stored values exceeds max_values.
+
+    The cache is opt-in only: it's used when passed as the cache argument (of find_U0_bnd, find_U0_bnd_batch,
+    inverse_midp, get_midP_curve, or classical_replicates and the runs built on it), and none of the scripts
+    pass one. The batched searches of classical_replicates step the central tail between neighbouring U0 and
+    evaluate the native Fisher variant for whole arrays at once, and both are several times slower through the
+    cache. It may still pay off where each mid-P evaluation is expensive, e.g. with BiasedUrn or scalar searches.
+
+    max_values:
+        integer, the memory budget, as the total number of mid-P values stored over all curves
+    hits, misses:
+        integers, the number of mid-P values that were found in / missing from the cache
+
+    >>> cache = MidPCache()
+    >>> find_U0_bnd(0.5, 50, 45, 3, 2, cache=cache) == find_U0_bnd(0.5, 50, 45, 3, 2, cache=cache)
+    True
+    >>> cache.hits > 0
+    True
+    '''
+
+    def __init__(self, max_values=10000000):
+
+        self.max_values = max_values
+        self.curves = OrderedDict() # key -> numpy array of mid-P values, ordered from least to most recently used
+        self.nvalues = 0            # total length of the stored curves
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+
+        self.curves.clear()
+        self.nvalues = 0
+        self.hits = 0
+        self.misses = 0
+
+    def info(self):
+        '''
+        Returns a dictionary summarising the cache usage
+        '''
+
+        return { 'hits': self.hits, 'misses': self.misses, 'curves': len(self.curves), 'nvalues': self.nvalues, 'max_values': self.max_values }
+
+    def _evict(self):
+
+        # drop the least recently used curves until we're within budget, but always keep the newest
+
+        while self.nvalues > self.max_values and len(self.curves) > 1:
+
+            _, curve = self.curves.popitem(last=False)
+            self.nvalues -= len(curve)
+
+    def _lookup(self, midP_fnc, U0, S0, S1, U1, d0, omega):
+
+        # returns mid-P values for a numpy array of U0 and a single scalar U1
+
+        key = (int(S0), int(S1), int(U1), int(d0), omega)
+        base = U1 + d0 # the curve starts at the minimum possible value of U0
+        U0 = np.asarray(U0)
+        vals = np.empty(U0.shape)
+
+        # values of U0 below the minimum possible are never part of a search, so aren't cached
+
+        below = U0 < base
+        if np.any(below):
+            vals[below] = midP_fnc(U0[below], S0, S1, U1, d0)
+
+        above = ~below
+        if not np.any(above):
+            return vals
+
+        # find the curve and make sure it's long enough
+
+        idxs = U0[above] - base
+        curve = self.curves.get(key)
+
+        if curve is None:
+
+            curve = np.full(idxs.max()+1, np.nan)
+
+        elif len(curve) <= idxs.max():
+
+            self.nvalues -= len(curve)
+            curve = np.concatenate(( curve, np.full(max(idxs.max()+1, 2*len(curve)) - len(curve), np.nan) ))
+
+        else:
+
+            self.nvalues -= len(curve)
+
+        # fill in the missing values
+
+        v = curve[idxs]
+        missing = np.isnan(v)
+        nmissing = int(np.count_nonzero(missing))
+
+        if nmissing > 0:
+            v[missing] = midP_fnc(idxs[missing] + base, S0, S1, U1, d0)
+            curve[idxs[missing]] = v[missing]
+
+        self.hits += len(v) - nmissing
+        self.misses += nmissing
+        vals[above] = v
+
+        # store as most recently used
+
+        self.curves[key] = curve
+        self.curves.move_to_end(key)
+        self.nvalues += len(curve)
+        self._evict()
+
+        return vals
+
+    def wrap(self, midP_fnc, omega=None):
+        '''
+        cached_midP_fnc = cache.wrap(midP_fnc, omega=None)
+
+        Returns a function with the same arguments (U0, S0, S1, U1, d0) as midP_fnc that looks its
+        values up in the cache, and calls midP_fnc only for values not yet stored.
+        '''
+
+        omega = omega if omega else None
+
+        def cached_midP_fnc(U0, S0, S1, U1, d0):
+
+            if np.ndim(U0) == 0 and np.ndim(U1) == 0:
+
+                return self._lookup(midP_fnc, np.array([U0]), S0, S1, U1, d0, omega)[0]
+
+            U0, U1 = np.broadcast_arrays(np.asarray(U0), np.asarray(U1))
+            vals = np.empty(U0.shape)
+
+            # each distinct value of U1 has its own curve
+
+            U1_uniq, inv = np.unique(U1, return_inverse=True)
+            inv = inv.reshape(U1.shape)
+
+            for i, U1_i in enumerate(U1_uniq):
+
+                sel = inv == i
+                vals[sel] = self._lookup(midP_fnc, U0[sel], S0, S1, U1_i, d0, omega)
+
+            return vals
+
+        return cached_midP_fnc
+
+def _count_midP_evals(midP_fnc, stats, U0_arg=0):
+
+    # wraps midP_fnc so that the number of values it evaluates, i.e. the size of its
+    # U0 argument (at position U0_arg), is added to stats['midP_evals'], and the time
+    # it takes to stats['midP_seconds']
+
+    def counted_midP_fnc(*args):
+
+        stats['midP_evals'] = stats.get('midP_evals', 0) + np.size(args[U0_arg])
+        tic = time.perf_counter()
+        midP = midP_fnc(*args)
+        stats['midP_seconds'] = stats.get('midP_seconds', 0) + time.perf_counter() - tic
+
+        return midP
+
+    return counted_midP_fnc
+
+def _get_search_midP_fnc(S0, S1, U1, d0, omega=None, biasedurn=None, cache=None, backend='logspace', stats=None):
+    '''
+    midP_fnc = _get_search_midP_fnc(S0, S1, U1, d0, omega=None, biasedurn=None, cache=None, backend='logspace', stats=None)
+
+    The mid-P function used by one search for U0_bnd (find_U0_bnd, either method),
+    wrapped in the cache if there is one, otherwise stepping the central tail between probes,
+    and counting the call and its evaluations in stats
+    '''
+
+    midP_fnc = get_midP_fnc(omega, biasedurn, backend)
+    if cache is not None:
+        midP_fnc = cache.wrap(midP_fnc, omega)
+    elif not omega and backend == 'logspace':
+        # carry the tail between probes, so that probes at neighbouring U0 are cheap updates
+        stepper = _CentralStepper(1, S0, S1, U1, d0)
+        midP_fnc = lambda U0, S0, S1, U1, d0: stepper([0], [U0])[0]
+
+    if stats is not None:
+        stats['calls'] = stats.get('calls', 0) + 1
+        midP_fnc = _count_midP_evals(midP_fnc, stats)
+
+    return midP_fnc
+
+def _secant_search(alpha, min_poss_U0, midP_min, midP_fnc, S0, S1, U1, d0, hint=None, stats=None):
+
+    # The search of find_U0_bnd with method = 'secant'. Returns the greatest U0 such that midP_fnc(U0, ...) >= alpha,
+    # given midP_min = midP_fnc(min_poss_U0, ...) >= alpha. It works with g(U0) = logit(midP) - logit(alpha), which
+    # decreases with U0 and is closer to linear than the mid-P function (as in inverse_midp):
+    # 1. while there's no upper bound, gallop as find_U0_bnd does, but stretch each step to overshoot the root
+    #    extrapolated through the last two lower bounds by half as much again
+    # 2. within the bracket [U0_lo, U0_hi], take false-position steps on g, falling back to a bisection step
+    #    when g is infinite at either end or the last false-position step didn't halve the bracket
+    # The steps are counted in stats as 'secant_steps' and 'fallback_steps' (galloping or bisection)
+
+    logit_alpha = logit(alpha)
+    g_at = { min_poss_U0: logit(midP_min) - logit_alpha } # U0 -> g(U0)
+
+    def is_lo(U0):
+        # evaluate at U0, record g, and return True if U0 is a lower bound of the search
+
+        midP = midP_fnc(U0, S0, S1, U1, d0)
+        g_at[U0] = logit(midP) - logit_alpha
+        return midP >= alpha
+
+    def count(key):
+        if stats is not None:
+            stats[key] = stats.get(key, 0) + 1
+
+    U0_lo = min_poss_U0
+    U0_hi = None    # no upper bound found yet
+    U0_prev = None  # the lower bound before U0_lo
+
+    if hint is not None and hint > min_poss_U0:
+        if is_lo(hint):
+            U0_lo = hint
+        else:
+            U0_hi = hint
+
+
+    # 1. find an upper bound
+    # ----
+
+    step_size = 1 # doubles at each step
+
+    while U0_hi is None:
+
+        U0_next = U0_lo + step_size
+        stretched = False
+
+        if U0_prev is not None and np.isfinite(g_at[U0_prev]) and np.isfinite(g_at[U0_lo]) and g_at[U0_prev] > g_at[U0_lo]:
+
+            U0_root = U0_lo - g_at[U0_lo] * (U0_lo - U0_prev) / (g_at[U0_lo] - g_at[U0_prev])
+            U0_stretch = int(np.ceil( U0_lo + 1.5*(U0_root - U0_lo) )) + 1
+            if U0_stretch > U0_next:
+                U0_next = U0_stretch
+                stretched = True
+
+        count('secant_steps' if stretched else 'fallback_steps')
+
+        if is_lo(U0_next):
+            U0_prev = U0_lo
+            U0_lo = U0_next
+            step_size *= 2
+        else:
+            U0_hi = U0_next
+
+
+    # 2. narrow the bracket to U0_hi = U0_lo + 1
+    # ----
+
+    secant_ok = True
+
+    while U0_hi - U0_lo > 1:
+
+        width = U0_hi - U0_lo
+        g_lo = g_at[U0_lo]; g_hi = g_at[U0_hi]
+
+        U0_next = None
+        if secant_ok and np.isfinite(g_lo) and np.isfinite(g_hi) and g_lo != g_hi:
+            U0_next = int(round( U0_lo - g_lo * width / (g_hi - g_lo) ))
+            if U0_next <= U0_lo or U0_next >= U0_hi:
+                U0_next = None
+
+        took_secant = U0_next is not None
+        if not took_secant:
+            U0_next = (U0_lo + U0_hi) // 2 # floored midpoint
+        count('secant_steps' if took_secant else 'fallback_steps')
+
+        if is_lo(U0_next):
+            U0_lo = U0_next
+        else:
+            U0_hi = U0_next
+
+        # after a false-position step that didn't halve the bracket, bisect next
+        secant_ok = not took_secant or 2*(U0_hi - U0_lo) <= width
+
+    return U0_lo
+
+def find_U0_bnd(alpha, S0, S1, U1, d0, impossibleFlag=False, omega=None, biasedurn=None, cache=None, backend='logspace', hint=None, stats=None, method='bisect'):
     '''
-    U0_bnd = inverse_midp(alpha, min_poss_U0, S0, S1, U1, d0, impossibleFlag=False, omega=None, biasedurn=None)
+    U0_bnd, impossibleFlag = find_U0_bnd(alpha, S0, S1, U1, d0, impossibleFlag=False, omega=None, biasedurn=None, cache=None, backend='logspace', hint=None, stats=None, method='bisect')
 
     Find the bound for the number of undetected extant species at the previous timestep (U0)
     given the data at a given timestep (S1, U1, d0 etc.) and confidence level using the
@@ -188,22 +916,40 @@ def find_U0_bnd(alpha, S0, S1, U1, d0, impossibleFlag=False, omega=None, biasedu
         can be modelled. It needs to be loaded and passed from the function that
         calls this function, allong with the objects passer, 
         i.e. rpy2.robjects.numpy2ri.activate(); biasedurn = rpy2.robjects.packages.importr('BiasedUrn')
+        If biasedurn is None, the Fisher variant is computed natively (see midP_fisher)
+    cache:
+        MidPCache, optional cache of mid-P values shared between calls (e.g. between replicates)
+    backend:
+        string, 'logspace' (default) or 'scipy', how the central variant's mid-P function is computed,
+        see get_midP_fnc
+    hint:
+        integer, optional guess of U0_bnd (e.g. the bound found for this timestep by the previous
+        replicate) around which the search brackets first; the result doesn't depend on it
+    stats:
+        dictionary, optional, where the counts 'calls' and 'midP_evals' (the number of mid-P
+        evaluations) are accumulated, and with method = 'secant' also 'secant_steps' and 'fallback_steps'
+    method:
+        string, how the bound is searched for: 'bisect' (default) gallops upwards to bracket the bound
+        and then bisects, 'secant' takes secant steps on the logit of the mid-P function (as inverse_midp
+        does) and falls back to galloping and bisection where they fail to make progress. Both find the
+        same bound. The secant search takes fewer evaluations where the bound is far above its minimum
+        (e.g. large U1 or d0) but gains little near it, see the benchmark module
+
+    >>> alphaV = np.linspace(0.01, 0.99, 50)
+    >>> [ find_U0_bnd(alpha, 200, 220, 2000, 40, omega=0.172, method='secant') for alpha in alphaV ] == [ find_U0_bnd(alpha, 200, 220, 2000, 40, omega=0.172) for alpha in alphaV ]
+    True
     '''
 
+    if method not in ('bisect', 'secant'):
+        raise ValueError('unknown method: ' + str(method))
+
     min_poss_U0 = U1 + d0 # the minimum possible value of U0 in reality
 
 
     # define the mid-P function that we will be using
     # ---
 
-    if omega: # doing the Fisher variant
-
-        midP_fnc = lambda U0, S0, S1, U1, d0: 0.5 * ( biasedurn.pFNCHypergeo( U1+d0, U0, S0, S1+U1, omega )[0] + biasedurn.pFNCHypergeo( U1+d0-1, U0, S0, S1+U1, omega )[0] )
-
-    else: # central hypergeom, assumes equal probability of extinction
-
-        midP_fnc = lambda U0, S0, S1, U1, d0: 0.5 * ( hypergeom.cdf( U1+d0, S0+U0, U0, S1+U1 ) + hypergeom.cdf( U1+d0-1, S0+U0, U0, S1+U1 ) )
-
+    midP_fnc = _get_search_midP_fnc(S0, S1, U1, d0, omega, biasedurn, cache, backend, stats)
 
 
     # obtain a sample value of U0 at our confidence level alpha
@@ -211,7 +957,9 @@ def find_U0_bnd(alpha, S0, S1, U1, d0, impossibleFlag=False, omega=None, biasedu
 
     # first, check if we're in the situation where we wouldn't accept the minimum possible value of U0
 
-    if midP_fnc(min_poss_U0, S0, S1, U1, d0) < alpha:
+    midP_min = midP_fnc(min_poss_U0, S0, S1, U1, d0)
+
+    if midP_min < alpha:
 
         if impossibleFlag:
 
@@ -224,6 +972,14 @@ def find_U0_bnd(alpha, S0, S1, U1, d0, impossibleFlag=False, omega=None, biasedu
             U0_bnd = min_poss_U0-1 
             impossibleFlag = True
 
+    elif method == 'secant':
+
+        U0_bnd = _secant_search(alpha, min_poss_U0, midP_min, midP_fnc, S0, S1, U1, d0, hint, stats)
+
+        if U0_bnd > min_poss_U0:
+            # we've moved out of the impossible region
+            impossibleFlag = False
+
     else:
 
         # We are trying to find the greatest value of U0, called U0_bnd, such that
@@ -248,6 +1004,37 @@ def find_U0_bnd(alpha, S0, S1, U1, d0, impossibleFlag=False, omega=None, biasedu
         step_size = 1 # this will double at each step
         U0_hi_found = False
 
+        # If we have a hint, we start there instead. If the hint is above the bound, it is an upper bound,
+        # and we work our way downwards from it in the same way until we find a U0_lo such that
+        # midP_fnc(U0_lo, ...) >= alpha (we know that min_poss_U0 is one). Otherwise, it's the lower bound
+        # we gallop upwards from.
+
+        if hint is not None and hint > min_poss_U0:
+
+            if midP_fnc(hint, S0, S1, U1, d0) < alpha:
+
+                U0_hi = hint
+                U0_hi_found = True
+                U0_lo_found = False
+
+                while not U0_lo_found:
+
+                    # prospective lower
+                    U0_lo = max(U0_hi - step_size, min_poss_U0)
+
+                    if U0_lo == min_poss_U0 or midP_fnc(U0_lo, S0, S1, U1, d0) >= alpha:
+
+                        U0_lo_found = True
+
+                    else:
+
+                        U0_hi = U0_lo   # this is new upper bound for search
+                        step_size *= 2
+
+            else:
+
+                U0_lo = hint
+
         while not U0_hi_found:
 
             # prospective upper
@@ -315,28 +1102,1336 @@ def find_U0_bnd(alpha, S0, S1, U1, d0, impossibleFlag=False, omega=None, biasedu
 
     return U0_bnd, impossibleFlag
     
-# old version of find_U0_bnd, use find_U0_bnd instead
-def inverse_midp(alpha, min_poss_U0, S0, S1, U1, d0, omega=None, biasedurn=None):
+def find_U0_bnd_batch(alphaV, S0, S1, U1V, d0, impossibleFlagV=None, omega=None, biasedurn=None, cache=None, backend='logspace', hintV=None, stats=None):
+    '''
+    U0_bndV, impossibleFlagV = find_U0_bnd_batch(alphaV, S0, S1, U1V, d0, impossibleFlagV=None, omega=None, biasedurn=None, cache=None, backend='logspace', hintV=None, stats=None)
+
+    Batched version of find_U0_bnd. Finds the bound on U0 for many confidence levels at once for
+    one timestep, e.g. for every replicate of the classical method. The galloping and binary search
+    of find_U0_bnd are done in lockstep on arrays, so each element follows exactly the same
+    sequence of mid-P evaluations as the scalar function and the results are identical.
+
+    alphaV:
+        numpy array of floats, confidence levels (e.g. obtained by randomly sampling ~ U(0,1))
+    S0, S1, d0:
+        integers, as in find_U0_bnd
+    U1V:
+        integer or numpy array of integers, the number of undetected extant species at the
+        current timestep for each element of alphaV
+    impossibleFlagV:
+        numpy array of logicals, whether or not each element is already in the "impossible" region
+        (default all False)
+    omega:
+        float, as in find_U0_bnd, or a numpy array of floats giving each element its own omega for
+        the native Fisher variant (in which case omega = 1 is the central model, and no cache is used)
+    biasedurn, cache, backend:
+        as in find_U0_bnd
+    stats:
+        dictionary, optional, where the counts 'calls' and 'midP_evals' are accumulated as in find_U0_bnd,
+        along with the time spent evaluating the mid-P function ('midP_seconds'), the time spent in the
+        bracketing and bisection phases of the search including their mid-P evaluations ('bracket_seconds'
+        and 'bisect_seconds'), and the cache's 'cache_hits' and 'cache_misses'
+    hintV:
+        integer or numpy array of integers, optional guesses of the bounds, as the hint in find_U0_bnd
+    U0_bndV:
+        numpy array of integers, the bound on U0 for each element of alphaV
+    impossibleFlagV:
+        numpy array of logicals, the updated impossible-region flags
+
+    >>> alphaV = np.array([0.1, 0.5, 0.9, 0.999])
+    >>> U0_bndV, flagV = find_U0_bnd_batch(alphaV, 50, 45, np.array([0, 3, 3, 0]), 2)
+    >>> [ find_U0_bnd(alpha, 50, 45, U1, 2)[0] for alpha, U1 in zip(alphaV, [0, 3, 3, 0]) ] == list(U0_bndV)
+    True
     '''
-    U0_bnd = inverse_midp(alpha, min_poss_U0, S0, S1, U1, d0, omega=None, biasedurn=None)
 
-    Find the bound for the number of undetected extant species at the previous timestep (U0)
-    given the data at a given timestep (S1, U1, d0 etc.) and confidence level using the
-    mid-P method.
+    alphaV = np.asarray(alphaV, dtype=float)
+    U1V = np.broadcast_to(np.asarray(U1V, dtype=int), alphaV.shape).copy()
+    if impossibleFlagV is None:
+        impossibleFlagV = np.zeros(alphaV.shape, dtype=bool)
+    else:
+        impossibleFlagV = np.array(impossibleFlagV, dtype=bool)
+
+    # midP_at(ii, U0) evaluates the mid-P function for the elements with flat indices ii
+
+    if np.ndim(omega) > 0:
+        omegaV = np.broadcast_to(np.asarray(omega, dtype=float), alphaV.shape).ravel()
+        midP_at = lambda ii, U0: midP_fisher(U0, S0, S1, U1V.flat[ii], d0, omegaV[ii])
+    elif cache is not None:
+        midP_fnc = cache.wrap(get_midP_fnc(omega, biasedurn, backend), omega)
+        midP_at = lambda ii, U0: midP_fnc(U0, S0, S1, U1V.flat[ii], d0)
+    elif not omega and backend == 'logspace':
+        # as in find_U0_bnd, carry the tail of each element between its probes
+        midP_at = _CentralStepper(alphaV.size, S0, S1, U1V.ravel(), d0)
+    else:
+        midP_fnc = get_midP_fnc(omega, biasedurn, backend)
+        midP_at = lambda ii, U0: midP_fnc(U0, S0, S1, U1V.flat[ii], d0)
 
-    By default the model used is the central hypergeometric distribution. When omega is specified,
-    the Fisher non-central hypergeometric distribution is used instead.
+    if stats is not None:
+        stats['calls'] = stats.get('calls', 0) + alphaV.size
+        midP_at = _count_midP_evals(midP_at, stats, 1)
+        if cache is not None:
+            hits0 = cache.hits; misses0 = cache.misses
+        tic = time.perf_counter()
 
-    alpha:
-        float, confidence level (e.g. obtained by randomly sampling ~ U(0,1))
-    min_poss_U0:
-        integer, the minimum possible value of undetected extant species at the previous timestep
-    S0:
-        integer, the number of detected extant species at the previous timestep
-    S1:
-        integer, the number of detected extant species at the current timestep
-    U1:
-        integer, the number of undetected extant species at the current timestep
+    min_poss_U0V = U1V + d0 # the minimum possible value of U0 in reality
+    U0_bndV = np.zeros(alphaV.shape, dtype=int)
+
+
+    # first, check which are in the situation where we wouldn't accept the minimum possible value of U0
+    # ---
+
+    impossible = midP_at(np.arange(alphaV.size), min_poss_U0V.ravel()).reshape(alphaV.shape) < alphaV
+
+    # don't take two steps in to the impossible region, otherwise set to the 'impossible' value
+    U0_bndV[impossible] = np.where( impossibleFlagV[impossible], min_poss_U0V[impossible], min_poss_U0V[impossible]-1 )
+    impossibleFlagV[impossible] = True
+
+
+    # for the remainder, do the two-phase search of find_U0_bnd on all elements at once
+    # ---
+
+    idxs = np.flatnonzero(~impossible)
+
+    if len(idxs) > 0:
+
+        alpha = alphaV.flat[idxs]
+
+        # 1. find an interval [U0_lo, U0_hi] within which U0_bnd lies, by galloping
+
+        min_poss_U0 = min_poss_U0V.flat[idxs]
+        U0_lo = min_poss_U0.copy()
+        U0_hi = np.zeros(U0_lo.shape, dtype=int)
+        step_size = np.ones(U0_lo.shape, dtype=int)
+        active = np.ones(U0_lo.shape, dtype=bool)
+
+        # where there's a hint, start from there, galloping downwards if the hint is above the bound
+
+        if hintV is not None:
+
+            hint = np.broadcast_to(np.asarray(hintV, dtype=int), alphaV.shape).flat[idxs]
+            h = np.flatnonzero(hint > min_poss_U0)
+
+            hint_above = midP_at(idxs[h], hint[h]) < alpha[h]
+            U0_lo[h[~hint_above]] = hint[h[~hint_above]]
+
+            down = h[hint_above]
+            U0_hi[down] = hint[down]
+            active[down] = False
+
+            while len(down) > 0:
+
+                U0_lo[down] = np.maximum(U0_hi[down] - step_size[down], min_poss_U0[down]) # prospective lower
+
+                found = U0_lo[down] == min_poss_U0[down]
+                m = np.flatnonzero(~found)
+                found[m] = midP_at(idxs[down[m]], U0_lo[down[m]]) >= alpha[down[m]]
+
+                U0_hi[down[~found]] = U0_lo[down[~found]] # new upper bound for search
+                step_size[down[~found]] *= 2
+                down = down[~found]
+
+        while np.any(active):
+
+            a = np.flatnonzero(active)
+            U0_hi[a] = U0_lo[a] + step_size[a]
+            below = midP_at(idxs[a], U0_hi[a]) < alpha[a]
+
+            active[a[below]] = False            # we've found an upper bound to search within
+            U0_lo[a[~below]] = U0_hi[a[~below]] # this is the new lower bound for search
+            step_size[a[~below]] *= 2           # double the step size for next time
+
+        # 2. binary search between our upper and lower search bounds, U0_lo and U0_hi
+
+        if stats is not None:
+            toc = time.perf_counter(); stats['bracket_seconds'] = stats.get('bracket_seconds', 0) + toc - tic; tic = toc
+
+        active = U0_hi - U0_lo != 1
+
+        while np.any(active):
+
+            a = np.flatnonzero(active)
+            U0_mid = (U0_lo[a] + U0_hi[a]) // 2  # floored midpoint
+            alpha_mid = midP_at(idxs[a], U0_mid)
+
+            exact = alpha_mid == alpha[a]   # it's the actual bound (unlikely to happen)
+            below = alpha_mid < alpha[a]    # the mid-point is a new upper bound
+
+            U0_hi[a[below]] = U0_mid[below]
+            U0_lo[a[~below]] = U0_mid[~below]
+
+            active[a] = ~exact & (U0_hi[a] - U0_lo[a] != 1)
+
+        # the bound is stored in U0_lo
+        U0_bndV.flat[idxs] = U0_lo
+
+        # those that have moved out of the impossible region
+        impossibleFlagV.flat[idxs[U0_lo > min_poss_U0V.flat[idxs]]] = False
+
+        if stats is not None:
+            stats['bisect_seconds'] = stats.get('bisect_seconds', 0) + time.perf_counter() - tic
+
+    if stats is not None and cache is not None:
+        stats['cache_hits'] = stats.get('cache_hits', 0) + cache.hits - hits0
+        stats['cache_misses'] = stats.get('cache_misses', 0) + cache.misses - misses0
+
+    U0_bndV[U0_bndV < 0] = 0 # don't allow negative numbers of undetected species
+
+    return U0_bndV, impossibleFlagV
+    
+def get_midP_curve(S0, S1, U1, d0, alpha_min=None, omega=None, biasedurn=None, cache=None, backend='logspace', tail_mass=1e-9):
+    '''
+    U0V, midPV = get_midP_curve(S0, S1, U1, d0, alpha_min=None, omega=None, biasedurn=None, cache=None, backend='logspace', tail_mass=1e-9)
+
+    Evaluates the mid-P function used by find_U0_bnd over the whole range of U0 from the
+    minimum possible value U1+d0 up to U0_max. The mid-P function decreases with U0, and U0_max is
+    chosen adaptively (by doubling the length of the curve) as the first value where the mid-P
+    function falls below alpha_min, so that every confidence level >= alpha_min has its bound
+    within the curve, or below tail_mass if alpha_min isn't given.
+
+    S0, S1, U1, d0, omega, biasedurn, cache, backend:
+        as in find_U0_bnd
+    alpha_min:
+        float, the smallest confidence level that the curve will be used for
+    tail_mass:
+        float, the mid-P value below which the curve is truncated when alpha_min isn't given
+    U0V:
+        numpy array of integers, U1+d0, U1+d0+1, ..., U0_max
+    midPV:
+        numpy array of floats, the mid-P function evaluated at each U0V
+    '''
+
+    midP_fnc = get_midP_fnc(omega, biasedurn, backend)
+    if not omega and backend == 'logspace':
+        # evaluate the contiguous range spanned by the U0 requested using the recurrence in U0
+        midP_fnc = lambda U0, S0, S1, U1, d0: midP_central_range(U0.min(), U0.max(), S0, S1, U1, d0)[U0 - U0.min()]
+    if cache is not None:
+        midP_fnc = cache.wrap(midP_fnc, omega)
+
+    threshold = tail_mass if alpha_min is None else alpha_min
+    min_poss_U0 = U1 + d0
+
+    # keep doubling the length of the curve until we're far enough into the tail
+
+    U0V = np.arange(min_poss_U0, min_poss_U0+64)
+    midPV = midP_fnc(U0V, S0, S1, U1, d0)
+
+    while midPV[-1] >= threshold:
+
+        U0V_next = np.arange(U0V[-1]+1, U0V[-1]+1+len(U0V))
+        U0V = np.concatenate(( U0V, U0V_next ))
+        midPV = np.concatenate(( midPV, midP_fnc(U0V_next, S0, S1, U1, d0) ))
+
+    return U0V, midPV
+
+def find_U0_bnd_curve(alphaV, S0, S1, U1V, d0, impossibleFlagV=None, omega=None, biasedurn=None, cache=None, backend='logspace'):
+    '''
+    U0_bndV, impossibleFlagV = find_U0_bnd_curve(alphaV, S0, S1, U1V, d0, impossibleFlagV=None, omega=None, biasedurn=None, cache=None, backend='logspace')
+
+    An alternative to find_U0_bnd_batch that samples U0 by inverting a precomputed mid-P curve.
+    For each distinct value of U1, the mid-P curve over U0 is evaluated once (see get_midP_curve), and
+    then each confidence level is mapped to its bound, the greatest U0 such that midP_fnc(U0, ...) >= alpha,
+    with a single np.searchsorted. Each curve is only as long as is needed by the smallest alpha.
+    Because the mid-P function decreases with U0, the result is the same as find_U0_bnd's,
+    including the treatment of the impossible region.
+
+    Arguments and return values are the same as find_U0_bnd_batch
+
+    >>> alphaV = np.array([0.1, 0.5, 0.9, 0.999])
+    >>> U0_bndV, flagV = find_U0_bnd_curve(alphaV, 50, 45, np.array([0, 3, 3, 0]), 2)
+    >>> list(U0_bndV) == list(find_U0_bnd_batch(alphaV, 50, 45, np.array([0, 3, 3, 0]), 2)[0])
+    True
+    '''
+
+    alphaV = np.asarray(alphaV, dtype=float)
+    U1V = np.broadcast_to(np.asarray(U1V, dtype=int), alphaV.shape)
+    if impossibleFlagV is None:
+        impossibleFlagV = np.zeros(alphaV.shape, dtype=bool)
+    else:
+        impossibleFlagV = np.array(impossibleFlagV, dtype=bool)
+
+    U0_bndV = np.zeros(alphaV.shape, dtype=int)
+
+    for U1 in np.unique(U1V):
+
+        sel = U1V == U1
+        alpha = alphaV[sel]
+        min_poss_U0 = U1 + d0 # the minimum possible value of U0 in reality
+
+        # number of points on the curve with midP >= alpha; the curve is decreasing, so negate it for searchsorted
+
+        U0V, midPV = get_midP_curve(S0, S1, U1, d0, alpha.min(), omega, biasedurn, cache, backend)
+        cnt = np.searchsorted(-midPV, -alpha, side='right')
+
+        # if we wouldn't accept the minimum possible value of U0, then we're in the impossible region,
+        # but don't take two steps in to the impossible region
+
+        flag = impossibleFlagV[sel]
+        impossible = cnt == 0
+        U0_bnd = np.where( impossible, np.where( flag, min_poss_U0, min_poss_U0-1 ), min_poss_U0 + cnt - 1 )
+
+        flag[impossible] = True
+        flag[cnt > 1] = False # we've moved out of the impossible region
+
+        U0_bndV[sel] = U0_bnd
+        impossibleFlagV[sel] = flag
+
+    U0_bndV[U0_bndV < 0] = 0 # don't allow negative numbers of undetected species
+
+    return U0_bndV, impossibleFlagV
+    
+def _backward_pass(alphaM, S, d, U_T, omega=None, hints=None, **kwargs):
+
+    # Works each row of confidence levels alphaM, shape (nreps, T_idx-1), backwards through the timeseries
+    # at once using find_U0_bnd_batch, and returns the matrix of U, shape (nreps, T_idx).
+    # omega may be a scalar or an array with one value per row; kwargs are passed to find_U0_bnd_batch.
+    # If hints, each search starts from the minimum possible U0 plus the median offset of the bounds above
+    # their minimum at the timestep before (see classical_replicates for when this is the default)
+
+    nreps, T_idx = alphaM.shape[0], len(S)
+
+    if np.ndim(omega) > 0:
+        omega = np.broadcast_to(np.asarray(omega, dtype=float), (nreps,))
+
+    if hints is None:
+        hints = np.ndim(omega) == 0 and not omega and kwargs.get('backend', 'logspace') == 'logspace' and kwargs.get('cache') is None
+
+    U = np.zeros((nreps, T_idx), dtype=int)
+    U[:,-1] = U_T
+    impossibleFlagV = np.zeros(nreps, dtype=bool)
+
+    for t in reversed(range(1, T_idx)): # work our way backwards
+
+        hintV = None
+        if hints and t < T_idx-1:
+            offset = int(np.median( U[:,t] - U[:,t+1] - d[t] )) # how far the bounds sat above their minimum last time
+            hintV = U[:,t] + d[t-1] + offset
+
+        U[:,t-1], impossibleFlagV = find_U0_bnd_batch(alphaM[:,t-1], S[t-1], S[t], U[:,t], d[t-1], impossibleFlagV, omega, hintV=hintV, **kwargs)
+
+    return U
+
+def _draw_alphas(rng, nreps, ndims, sampler='mc'):
+
+    # Draws the (nreps, ndims) matrix of confidence levels, either independently (sampler = 'mc'), or from a
+    # scrambled Sobol' sequence ('sobol') or a Latin hypercube ('lhs'), randomised by rng
+
+    if sampler == 'mc':
+        alphaM = rng.random((nreps, ndims))
+    elif sampler == 'sobol':
+        if nreps < 1 or nreps & (nreps-1) != 0:
+            raise ValueError("the number of Sobol' points must be a power of 2 to keep the balance of the sequence, not " + str(nreps))
+        alphaM = qmc.Sobol(ndims, scramble=True, seed=rng).random(nreps)
+    elif sampler == 'lhs':
+        alphaM = qmc.LatinHypercube(ndims, seed=rng).random(nreps)
+    else:
+        raise ValueError('unknown sampler: ' + str(sampler))
+
+    return alphaM
+
+def classical_replicates(S, E, U_T=0, nreps=10000, omega=None, seed=None, batch_size=20000, sampler='mc', alphaM=None, stats=None, hints=None, **kwargs):
+    '''
+    UM, XM = classical_replicates(S, E, U_T=0, nreps=10000, omega=None, seed=None, batch_size=20000, sampler='mc', alphaM=None, stats=None, hints=None, **kwargs)
+
+    Samples replicates of the classical method. Rather than each replicate working its way backwards
+    through the timeseries on its own, all the replicates are stepped backwards together: at each timestep,
+    a vector of confidence levels is drawn and the bounds for every replicate are found at once with
+    find_U0_bnd_batch.
+
+    The confidence levels are drawn from a numpy.random.Generator, one row of T_idx-1 per replicate
+    in the order the timesteps are worked through, so the replicates don't depend on batch_size.
+    Alternatively, the rows can be the points of a randomised quasi-Monte Carlo design (scipy.stats.qmc),
+    which fill the unit hypercube more evenly, so fewer replicates are needed for the same precision.
+    The error of such an estimate is found by repeating it with independent randomisations, which is what
+    the shards of run_classical are, e.g. with summarise_classical_adaptive.
+
+    S, E:
+        numpy arrays of integers, the number of detected extant and extinct species at each timestep,
+        e.g. from get_SE
+    U_T:
+        integer, the number of undetected extant species at the final timestep
+    nreps:
+        integer, the number of replicates
+    omega:
+        float, the odds ratio of survival in undetected / detected species (None for the central model)
+    seed:
+        integer, numpy.random.SeedSequence or numpy.random.Generator, the source of the confidence levels
+    batch_size:
+        integer, the maximum number of replicates worked backwards at once (limits the memory used)
+    sampler:
+        string, how the confidence levels are drawn: 'mc' independently, 'sobol' from a scrambled Sobol'
+        sequence (nreps must be a power of 2), or 'lhs' from a Latin hypercube
+    alphaM:
+        numpy array of floats, shape (nreps, T_idx-1), optional pre-drawn confidence levels, where
+        alphaM[:,t-1] is used to find U at timestep t-1 (seed and sampler are then ignored)
+    stats:
+        dictionary, optional, where 'rng_seconds' (the time spent drawing confidence levels) is accumulated,
+        along with find_U0_bnd_batch's counts
+    hints:
+        logical, whether to start each timestep's searches from a hint (see find_U0_bnd), the minimum
+        possible U0 plus the median offset of the bounds above their minimum at the timestep before;
+        the replicates don't depend on it. The default, None, uses hints only for the central model with the
+        logspace backend and no cache, where they save about 10% of the time on the Singapore record;
+        the lockstep Fisher searches are slowed down by the extra rounds of evaluations they take
+    kwargs:
+        passed to find_U0_bnd_batch, e.g. biasedurn, cache, backend. No MidPCache is used unless one is
+        passed: the batched searches of the central model step their tails from one U0 to the next and the
+        native Fisher variant evaluates whole arrays at once, and both are several times slower through a cache
+    UM, XM:
+        numpy arrays of integers, shape (nreps, T_idx), the number of undetected extant (U) and
+        undetected extinct (X) species at each timestep for each replicate
+
+    >>> S = np.array([40, 42, 45, 43, 40, 38]); E = np.array([0, 1, 2, 5, 9, 12])
+    >>> bool(np.array_equal( classical_replicates(S, E, 0, 500, seed=1, hints=True)[0], classical_replicates(S, E, 0, 500, seed=1, hints=False)[0] ))
+    True
+    '''
+
+    d = S[1:] - S[:-1] + E[1:] - E[:-1]     # discoveries at each timestep
+    T_idx = len(S)                          # number of timesteps
+
+    rng = np.random.default_rng(seed)
+    if stats is not None:
+        stats['rng_seconds'] = stats.get('rng_seconds', 0)
+        kwargs['stats'] = stats
+
+    # a quasi-Monte Carlo design has to be drawn all at once
+
+    alphaM_all = alphaM
+    if alphaM_all is None and sampler != 'mc':
+        tic = time.perf_counter()
+        alphaM_all = _draw_alphas(rng, nreps, T_idx-1, sampler)[:,::-1] # first column drawn is for the last timestep
+        if stats is not None: stats['rng_seconds'] += time.perf_counter() - tic
+
+    UM = np.zeros((nreps, T_idx), dtype=int)
+    for b in range(0, nreps, batch_size):
+
+        n = min(batch_size, nreps - b)
+
+        if alphaM_all is None:
+            tic = time.perf_counter()
+            alphaM = _draw_alphas(rng, n, T_idx-1)[:,::-1]
+            if stats is not None: stats['rng_seconds'] += time.perf_counter() - tic
+        else:
+            alphaM = alphaM_all[b:b+n]
+
+        UM[b:b+n] = _backward_pass(alphaM, S, d, U_T, omega, hints, **kwargs)
+
+    # calculate X_t from U_t
+
+    NV = S[0] + E[0] + UM[:,0] # assumes X(0) = 0
+    XM = NV[:,None] - E[None,:] - S[None,:] - UM
+
+    return UM, XM
+
+class ClassicalSummary:
+    '''
+    summary = ClassicalSummary(T_idx)
+
+    Streaming summary of the replicates of the classical method. Batches of replicates are added with
+    update(UM, XM), and the per-timestep means, variances and percentiles are available at any time,
+    without ever holding the full replicate matrices.
+
+    Because U and X are integers within a limited range at each timestep, the summary keeps an exact
+    histogram of their values at each timestep (plus exact integer sums for the moments) rather than an
+    approximate quantile sketch. Its memory is bounded by the range of the values, not by the number of
+    replicates, and the statistics are identical to np.mean, np.var and np.percentile on the full matrices.
+
+    T_idx:
+        integer, the number of timesteps
+    nreps:
+        integer, the number of replicates added so far
+
+    >>> UM = np.array([[3, 1], [5, 0], [4, 0], [9, 2]]); XM = 10 - UM
+    >>> summary = ClassicalSummary(2); summary.update(UM[:3], XM[:3]); summary.update(UM[3:], XM[3:])
+    >>> bool( np.all( summary.percentile('U', 2.5) == np.percentile(UM, 2.5, axis=0) ) )
+    True
+    '''
+
+    def __init__(self, T_idx):
+
+        self.T_idx = T_idx
+        self.nreps = 0
+
+        # for each of U and X, and each timestep: the smallest value, the counts of the values from it upwards
+        self.loV = { 'U': np.zeros(T_idx, dtype=int), 'X': np.zeros(T_idx, dtype=int) }
+        self.countsV = { 'U': [None]*T_idx, 'X': [None]*T_idx }
+
+        # exact sums of the values and their squares (Python integers, so they can't overflow)
+        self.sumV = { 'U': np.zeros(T_idx, dtype=object), 'X': np.zeros(T_idx, dtype=object) }
+        self.sumsqV = { 'U': np.zeros(T_idx, dtype=object), 'X': np.zeros(T_idx, dtype=object) }
+
+    def update(self, UM, XM):
+        '''
+        summary.update(UM, XM)
+
+        Adds a batch of replicates, UM and XM as returned by classical_replicates
+        '''
+
+        for var, M in [ ('U', UM), ('X', XM) ]:
+
+            M = np.asarray(M, dtype=np.int64)
+            self.sumV[var] += np.array( M.sum(axis=0).tolist(), dtype=object )
+            self.sumsqV[var] += np.array( (M*M).sum(axis=0).tolist(), dtype=object )
+
+            for t in range(self.T_idx):
+
+                vals = M[:,t]
+                lo = vals.min(); hi = vals.max()
+                counts = self.countsV[var][t]
+
+                if counts is None:
+
+                    self.loV[var][t] = lo
+                    counts = np.zeros(hi-lo+1, dtype=np.int64)
+
+                else:
+
+                    # extend the histogram to cover the new values
+                    old_lo = self.loV[var][t]
+                    new_lo = min(lo, old_lo); new_hi = max(hi, old_lo + len(counts) - 1)
+                    if new_lo < old_lo or new_hi > old_lo + len(counts) - 1:
+                        counts = np.concatenate([ np.zeros(old_lo-new_lo, dtype=np.int64), counts, np.zeros(new_hi - (old_lo + len(counts) - 1), dtype=np.int64) ])
+                    self.loV[var][t] = new_lo
+
+                counts += np.bincount(vals - self.loV[var][t], minlength=len(counts))
+                self.countsV[var][t] = counts
+
+        self.nreps += len(UM)
+
+    def mean(self, var):
+        '''
+        meanV = summary.mean(var)
+
+        The mean of 'U' or 'X' at each timestep
+        '''
+
+        return np.array( [ float(s) for s in self.sumV[var] ] ) / self.nreps
+
+    def var(self, var):
+        '''
+        varV = summary.var(var)
+
+        The variance (ddof = 0, as np.var) of 'U' or 'X' at each timestep
+        '''
+
+        n = self.nreps
+        return np.array( [ (sq*n - s*s) / (n*n) for s, sq in zip(self.sumV[var], self.sumsqV[var]) ], dtype=float )
+
+    def percentile(self, var, q):
+        '''
+        pV = summary.percentile(var, q)
+
+        The q'th percentile of 'U' or 'X' at each timestep, with the same linear interpolation as np.percentile
+        '''
+
+        n = self.nreps
+        h = (n-1) * (q/100)                 # position of the percentile in the sorted values
+        k = int(np.floor(h)); gamma = h - k
+
+        pV = np.zeros(self.T_idx)
+        for t in range(self.T_idx):
+
+            # the k'th and k+1'th sorted values
+            cum = np.cumsum(self.countsV[var][t])
+            a, b = self.loV[var][t] + np.searchsorted(cum, [ k, min(k+1, n-1) ], side='right')
+            a = float(a); b = float(b)
+
+            # interpolate as numpy does
+            diff_b_a = b - a
+            pV[t] = b - diff_b_a * (1 - gamma) if gamma >= 0.5 else a + diff_b_a * gamma
+
+        return pV
+
+    def get_stats(self, percentile=95):
+        '''
+        statsD = summary.get_stats(percentile=95)
+
+        The per-timestep statistics as a dictionary of numpy arrays, with keys
+        U_mean, X_mean, U_lo, U_hi, X_lo, X_hi (the percentile CI), U_var, X_var
+        '''
+
+        statsD = dict()
+        for var in [ 'U', 'X' ]:
+            statsD[var + '_mean'] = self.mean(var)
+            statsD[var + '_lo'] = self.percentile(var, (100-percentile)/2)
+            statsD[var + '_hi'] = self.percentile(var, 100 - (100-percentile)/2)
+            statsD[var + '_var'] = self.var(var)
+
+        return statsD
+
+    def write_csv(self, fname, years, S, E, percentile=95):
+        '''
+        summary.write_csv(fname, years, S, E, percentile=95)
+
+        Writes the summary to a CSV file in the format of classical.py, with header
+        year,S,E,U_mean,X_mean,U_lo,U_hi,X_lo,X_hi
+        '''
+
+        statsD = self.get_stats(percentile)
+
+        f = open(fname, 'w')
+        f.write(','.join(classical_fields) + '\n')
+
+        for row in zip(years, S, E, *[ statsD[field] for field in classical_fields[3:] ]):
+            row_string = list(map( lambda v: str(v), row ))
+            f.write(','.join(row_string))
+            f.write('\n')
+
+        f.close()
+
+# the per-timestep fields of the classical results, in the order of the CSV columns
+classical_fields = [ 'year', 'S', 'E', 'U_mean', 'X_mean', 'U_lo', 'U_hi', 'X_lo', 'X_hi' ]
+
+def file_sha256(fname):
+    '''
+    digest = file_sha256(fname)
+
+    The SHA-256 hash of a file as a hex string, e.g. to record which data file a result came from
+    '''
+
+    h = hashlib.sha256()
+
+    f = open(fname, 'rb')
+    for block in iter(lambda: f.read(1 << 20), b''):
+        h.update(block)
+    f.close()
+
+    return h.hexdigest()
+
+def save_classical(fname, years, S, E, summary, percentile=95, meta=None, UM=None, XM=None):
+    '''
+    save_classical(fname, years, S, E, summary, percentile=95, meta=None, UM=None, XM=None)
+
+    Saves the results of the classical method to a compressed numpy file, fname + '.npz', with one array
+    per field of the CSV (year, S, E, U_mean, X_mean, U_lo, U_hi, X_lo, X_hi), plus U_var and X_var, and
+    the metadata as a JSON string. The replicates, if given, are saved uncompressed to fname + '_U.npy'
+    and fname + '_X.npy', so read_classical can memory-map them; otherwise any replicates left there by an
+    earlier run are deleted, so they can't be mistaken for this run's.
+
+    fname:
+        string, the file name without extension
+    years, S, E:
+        numpy arrays, the years and the number of detected extant and extinct species at each timestep
+    summary:
+        ClassicalSummary, the summary of the replicates
+    percentile:
+        float, the CI to store
+    meta:
+        dictionary, the metadata of the run (JSON serialisable), e.g. omega, U_T, nreps, seed, and
+        the file_sha256 of the input file; percentile, nreps and which replicates were saved are added
+    UM, XM:
+        numpy arrays of integers, shape (nreps, T_idx), optional replicates
+    '''
+
+    meta = dict() if meta is None else dict(meta)
+    meta.update({ 'percentile': percentile, 'nreps': summary.nreps, 'replicates': [ key for key, M in [ ('UM', UM), ('XM', XM) ] if M is not None ] })
+
+    arrays = { 'year': np.asarray(years), 'S': np.asarray(S), 'E': np.asarray(E) }
+    arrays.update(summary.get_stats(percentile))
+    arrays['meta'] = np.array(json.dumps(meta))
+
+    np.savez_compressed(fname + '.npz', **arrays)
+
+    for M, suffix in [ (UM, '_U.npy'), (XM, '_X.npy') ]:
+        if M is not None:
+            np.save(fname + suffix, M)
+        elif os.path.isfile(fname + suffix):
+            os.remove(fname + suffix)
+
+def read_classical(fname, mmap=True):
+    '''
+    res = read_classical(fname, mmap=True)
+
+    Reads the results of the classical method, saved by save_classical (fname + '.npz') or written to a
+    CSV file by ClassicalSummary.write_csv or classical.py. If fname has no extension, the .npz file is read
+    if there is one, and the .csv file otherwise.
+
+    fname:
+        string, the file name
+    mmap:
+        logical, memory-map the replicates rather than reading them into memory
+    res:
+        dictionary of numpy arrays, with a key for each column of the CSV (year, S, E, U_mean, ...), and,
+        from a .npz file, U_var, X_var, the dictionary meta, and UM and XM if the replicates were saved
+    '''
+
+    base, ext = os.path.splitext(fname)
+    if ext == '':
+        ext = '.npz' if os.path.isfile(fname + '.npz') else '.csv'
+        fname = base + ext
+
+    if ext == '.npz':
+
+        npz = np.load(fname)
+        res = { key: npz[key] for key in npz.files if key != 'meta' }
+        res['meta'] = json.loads(str(npz['meta']))
+        npz.close()
+
+        # only the replicates saved with these results
+        for key, suffix in [ ('UM', '_U.npy'), ('XM', '_X.npy') ]:
+            if key in res['meta']['replicates']:
+                res[key] = np.load(base + suffix, mmap_mode='r' if mmap else None)
+
+    else:
+
+        csv_f = csv.reader(open(fname))
+        header = next(csv_f)
+        colsM = np.array([ [ float(ri) for ri in row ] for row in csv_f ]).T
+        res = dict(zip(header, colsM))
+
+    return res
+
+def _classical_shard(args):
+
+    # Samples one shard of run_classical's replicates (a top-level function, so it can be sent to a worker)
+
+    S, E, U_T, nreps, omega, seed, kwargs = args
+
+    stats = dict() # the shard's counts and timers, returned so they can be collected from the workers
+    UM, XM = classical_replicates(S, E, U_T, nreps, omega, seed, stats=stats, **kwargs)
+
+    return UM, XM, stats
+
+def _record_shard(stats, shard_stats, nreps, tic, callback):
+
+    # Adds a completed shard's counts and timers to stats, updates the throughput since tic, and
+    # reports the progress through logging and callback
+
+    for key, value in shard_stats.items():
+        stats[key] = stats.get(key, 0) + value
+
+    stats['nreps'] = stats.get('nreps', 0) + nreps
+    stats['seconds'] = time.perf_counter() - tic
+    stats['reps_per_sec'] = stats['nreps'] / stats['seconds']
+
+    logger.info('%d replicates, %.1f reps/sec, %d mid-P evaluations', stats['nreps'], stats['reps_per_sec'], stats.get('midP_evals', 0))
+    if callback is not None:
+        callback(stats)
+
+def run_classical(S, E, U_T=0, nreps=10000, omega=None, seed=None, nworkers=None, shard_size=1024, stats=None, callback=None, **kwargs):
+    '''
+    UM, XM = run_classical(S, E, U_T=0, nreps=10000, omega=None, seed=None, nworkers=None, shard_size=1024, stats=None, callback=None, **kwargs)
+
+    Samples replicates of the classical method in parallel. The replicates are split into shards of
+    shard_size, each shard is sampled by classical_replicates in a worker process, and the U and X
+    matrices of the shards are stacked at the end.
+
+    Each shard gets its own child of numpy.random.SeedSequence(seed), and the shards are always
+    the same size, so for a given seed the result is identical whatever the number of workers.
+
+    S, E, U_T, nreps, omega:
+        as in classical_replicates
+    seed:
+        integer or numpy.random.SeedSequence, the root of the shards' random streams
+    nworkers:
+        integer, the number of worker processes (default the number of CPUs); if 1, the shards
+        are sampled in this process
+    shard_size:
+        integer, the number of replicates per shard
+    stats:
+        dictionary, optional, where the counts and timers of all the shards are accumulated as each shard is
+        completed: those of classical_replicates and find_U0_bnd_batch (midP_evals, cache_hits, rng_seconds,
+        midP_seconds, bracket_seconds, bisect_seconds, which are summed over the workers), plus the time
+        spent combining the shards (aggregate_seconds), nreps done, the elapsed seconds, and reps_per_sec
+    callback:
+        function, optional, called with stats after each shard is completed (the progress is also
+        logged at level INFO)
+    kwargs:
+        passed to classical_replicates, e.g. sampler, backend; they must be picklable to send them to the
+        workers, so biasedurn can only be used with nworkers = 1. With a quasi-Monte Carlo sampler, each
+        shard is an independently randomised design; for 'sobol', shard_size must be a power of 2, and nreps
+        is rounded up to a whole number of shards, so that every design is balanced
+    UM, XM:
+        numpy arrays of integers, shape (nreps, T_idx), as in classical_replicates
+    '''
+
+    stats = dict() if stats is None else stats
+    tic = time.perf_counter()
+
+    sizeV, seedV = _plan_shards(nreps, shard_size, seed, kwargs.get('sampler', 'mc'))
+
+    UMV = list(); XMV = list()
+    for (UM, XM, shard_stats), size in zip(_classical_shards(S, E, U_T, sizeV, omega, seedV, nworkers, kwargs), sizeV):
+        UMV.append(UM); XMV.append(XM)
+        _record_shard(stats, shard_stats, size, tic, callback)
+
+    toc = time.perf_counter()
+    UM = np.concatenate(UMV)
+    XM = np.concatenate(XMV)
+    stats['aggregate_seconds'] = stats.get('aggregate_seconds', 0) + time.perf_counter() - toc
+
+    return UM, XM
+
+def _plan_shards(nreps, shard_size, seed, sampler='mc'):
+
+    # The sizes of the shards of nreps replicates, and their seeds (children of seed). A Sobol' design is only
+    # balanced for a power of 2 points, so with sampler 'sobol' every shard is a whole shard_size, a power of 2,
+    # and nreps is rounded up to a whole number of shards
+
+    nshards = -(-nreps // shard_size) # ceiling
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+
+    if sampler == 'sobol':
+        if shard_size < 1 or shard_size & (shard_size-1) != 0:
+            raise ValueError("shard_size must be a power of 2 for the 'sobol' sampler, not " + str(shard_size))
+        nreps = nshards * shard_size
+
+    sizeV = [ min(shard_size, nreps - i*shard_size) for i in range(nshards) ]
+    seedV = seed.spawn(nshards) # a SeedSequence spawns new children each time, so shards can be drawn in rounds
+
+    return sizeV, seedV
+
+def _classical_shards(S, E, U_T, sizeV, omega, seedV, nworkers, kwargs):
+
+    # Generates the (UM, XM) of each shard of run_classical, in the order of the shards, as they're completed
+
+    argsV = [ ( S, E, U_T, size, omega, seed, kwargs ) for size, seed in zip(sizeV, seedV) ]
+
+    if nworkers == 1:
+
+        yield from map(_classical_shard, argsV)
+
+    elif len(argsV) > 0:
+
+        with ProcessPoolExecutor(max_workers=nworkers) as executor:
+            yield from executor.map(_classical_shard, argsV)
+
+def save_checkpoint(fname, state):
+    '''
+    save_checkpoint(fname, state)
+
+    Pickles state to fname atomically: it's written to a temporary file first, which then replaces
+    fname, so if the run is killed part-way through, fname still holds the previous checkpoint
+    '''
+
+    fname_tmp = fname + '.tmp'
+
+    f = open(fname_tmp, 'wb')
+    pickle.dump(state, f)
+    f.flush()
+    os.fsync(f.fileno())
+    f.close()
+
+    os.replace(fname_tmp, fname)
+
+def load_checkpoint(fname):
+    '''
+    state = load_checkpoint(fname)
+
+    Reads a checkpoint written by save_checkpoint, or returns None if there isn't one
+    '''
+
+    if not os.path.isfile(fname):
+        return None
+
+    f = open(fname, 'rb')
+    state = pickle.load(f)
+    f.close()
+
+    return state
+
+def resume_checkpoint(checkpoint, resume, params, seed):
+    '''
+    state, seed = resume_checkpoint(checkpoint, resume, params, seed)
+
+    Returns the state of the run in checkpoint if we're resuming from one (or None), and the root seed
+    as a SeedSequence, restored from the checkpoint so the rest of the run gets the same random streams.
+    The checkpoint must be of a run with the same parameters, otherwise a ValueError is raised.
+
+    checkpoint:
+        string, the file name of the checkpoint, or None
+    resume:
+        boolean, whether to resume from the checkpoint
+    params:
+        dictionary, the parameters of the run, stored in the checkpoint as state['params']
+    seed:
+        integer, None or numpy.random.SeedSequence, the root seed if we're not resuming
+    state:
+        dictionary, as saved by save_checkpoint, with the keys params, entropy, spawn_key and n_children_spawned
+    '''
+
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+
+    state = load_checkpoint(checkpoint) if checkpoint is not None and resume else None
+
+    if state is not None:
+
+        if state['params'] != params:
+            raise ValueError('checkpoint ' + checkpoint + ' is of a run with different parameters: ' + str(state['params']))
+
+        # the same root seed, so the remaining shards get the same seeds as they would have
+        seed = np.random.SeedSequence(state['entropy'], spawn_key=state['spawn_key'], n_children_spawned=state['n_children_spawned'])
+
+    return state, seed
+
+def _run_params(S, E, seed, kwargs):
+
+    # The parameters that the results of a classical run depend on besides its own arguments, to check that a
+    # checkpoint is of the same run: a hash of the data, the seed as given and the mid-P backend
+
+    if isinstance(seed, np.random.SeedSequence):
+        seed = ( seed.entropy, tuple(seed.spawn_key) )
+
+    SE = np.concatenate(( np.asarray(S, dtype=np.int64), np.asarray(E, dtype=np.int64) ))
+
+    return { 'sha256_SE': hashlib.sha256(SE.tobytes()).hexdigest(), 'seed': seed,
+            'backend': kwargs.get('backend', 'logspace'), 'biasedurn': kwargs.get('biasedurn') is not None }
+
+def summarise_classical(S, E, U_T=0, nreps=10000, omega=None, seed=None, nworkers=None, shard_size=1024, summary=None, checkpoint=None, resume=False, checkpoint_every=10, stats=None, callback=None, **kwargs):
+    '''
+    summary = summarise_classical(S, E, U_T=0, nreps=10000, omega=None, seed=None, nworkers=None, shard_size=1024, summary=None, checkpoint=None, resume=False, checkpoint_every=10, stats=None, callback=None, **kwargs)
+
+    Samples replicates of the classical method as run_classical does, but adds each shard to a
+    ClassicalSummary as it is completed instead of keeping the replicates, so the memory used doesn't
+    grow with nreps. For the same seed, the statistics are identical to those of run_classical's matrices.
+
+    summary:
+        ClassicalSummary, optional summary to add the replicates to (default a new one)
+    checkpoint:
+        string, optional file that the summary, the number of shards done and the root seed are saved to
+        (see save_checkpoint) every checkpoint_every shards, and which is removed when the run finishes
+    resume:
+        logical, if True and checkpoint exists, continue the interrupted run saved there, which gives exactly
+        the same result as an uninterrupted run (even if seed was None). The checkpoint must be of a run with
+        the same parameters, data (S, E), seed and mid-P backend, otherwise a ValueError is raised
+    stats, callback:
+        as in run_classical, where aggregate_seconds is the time spent adding the shards to the summary,
+        and nreps and reps_per_sec count only the replicates done in this call
+
+    The other arguments are as for run_classical.
+    '''
+
+    params = { 'U_T': U_T, 'nreps': nreps, 'omega': omega, 'shard_size': shard_size, 'sampler': kwargs.get('sampler', 'mc') }
+    params.update(_run_params(S, E, seed, kwargs))
+    state, seed = resume_checkpoint(checkpoint, resume, params, seed)
+
+    if state is not None:
+        summary = state['summary']; nshards_done = state['nshards_done']
+    else:
+        nshards_done = 0
+
+    if summary is None:
+        summary = ClassicalSummary(len(S))
+
+    state = { 'params': params, 'entropy': seed.entropy, 'spawn_key': seed.spawn_key, 'n_children_spawned': seed.n_children_spawned }
+    sizeV, seedV = _plan_shards(nreps, shard_size, seed, kwargs.get('sampler', 'mc'))
+
+    stats = dict() if stats is None else stats
+    tic = time.perf_counter()
+
+    for UM, XM, shard_stats in _classical_shards(S, E, U_T, sizeV[nshards_done:], omega, seedV[nshards_done:], nworkers, kwargs):
+
+        toc = time.perf_counter()
+        summary.update(UM, XM)
+        stats['aggregate_seconds'] = stats.get('aggregate_seconds', 0) + time.perf_counter() - toc
+        _record_shard(stats, shard_stats, len(UM), tic, callback)
+
+        nshards_done += 1
+
+        if checkpoint is not None and nshards_done % checkpoint_every == 0 and nshards_done < len(sizeV):
+            state.update({ 'summary': summary, 'nshards_done': nshards_done })
+            save_checkpoint(checkpoint, state)
+
+    # the run is finished, so a later run starts afresh
+    if checkpoint is not None and os.path.isfile(checkpoint):
+        os.remove(checkpoint)
+
+    return summary
+
+def summarise_classical_adaptive(S, E, U_T=0, tol=5, omega=None, seed=None, nworkers=None, shard_size=1024, percentile=95, min_shards=10, shards_per_round=10, max_reps=1000000, summary=None, checkpoint=None, resume=False, stats=None, callback=None, **kwargs):
+    '''
+    summary, seD = summarise_classical_adaptive(S, E, U_T=0, tol=5, omega=None, seed=None, nworkers=None, shard_size=1024, percentile=95, min_shards=10, shards_per_round=10, max_reps=1000000, summary=None, checkpoint=None, resume=False, stats=None, callback=None, **kwargs)
+
+    Samples replicates of the classical method as summarise_classical does, in rounds of shards, until
+    the Monte Carlo errors of the reported CI endpoints of U_0 and X_T are below tol (or max_reps is reached).
+
+    The standard error of each endpoint is estimated by batch means: each shard is a batch, and the
+    standard error of the endpoint over all replicates is estimated as the standard deviation of the
+    endpoints of the batches divided by the square root of the number of batches. The stopping rule is
+    checked only between rounds, so for a given seed, the number of replicates used is the same
+    whatever the number of workers.
+
+    tol:
+        float, the largest acceptable standard error of the endpoints, in numbers of species
+    percentile:
+        float, the CI whose endpoints are checked
+    min_shards:
+        integer, the minimum number of shards (batches) before the errors are trusted
+    shards_per_round:
+        integer, the number of shards sampled between checks of the stopping rule
+    max_reps:
+        integer, stop after (about) this many replicates even if tol hasn't been reached
+    summary:
+        ClassicalSummary, as returned, whose nreps is the number of replicates used
+    seD:
+        dictionary, the standard errors of 'U0_lo', 'U0_hi', 'XT_lo' and 'XT_hi'
+    checkpoint, resume:
+        as in summarise_classical, except that the checkpoint is saved at the end of each round
+        (and removed when the run finishes)
+    stats, callback:
+        as in summarise_classical
+
+    The other arguments are as for run_classical.
+    '''
+
+    params = { 'U_T': U_T, 'tol': tol, 'omega': omega, 'shard_size': shard_size, 'percentile': percentile,
+            'min_shards': min_shards, 'shards_per_round': shards_per_round, 'max_reps': max_reps, 'sampler': kwargs.get('sampler', 'mc') }
+    params.update(_run_params(S, E, seed, kwargs))
+    state, seed = resume_checkpoint(checkpoint, resume, params, seed)
+
+    if state is not None:
+        summary = state['summary']; endpointsM = state['endpointsM']
+    else:
+        endpointsM = list() # the endpoints of each shard
+
+    if summary is None:
+        summary = ClassicalSummary(len(S))
+
+    qV = [ (100-percentile)/2, 100 - (100-percentile)/2 ]
+    names = [ 'U0_lo', 'U0_hi', 'XT_lo', 'XT_hi' ]
+
+    stats = dict() if stats is None else stats
+    tic = time.perf_counter()
+
+    done = False
+    while not done:
+
+        state = { 'params': params, 'entropy': seed.entropy, 'spawn_key': seed.spawn_key, 'n_children_spawned': seed.n_children_spawned }
+
+        if len(endpointsM) >= min_shards:
+            seV = np.std(endpointsM, axis=0, ddof=1) / np.sqrt(len(endpointsM))
+            done = np.all(seV < tol) or summary.nreps >= max_reps
+
+        if not done:
+
+            nshards = max(shards_per_round, min_shards - len(endpointsM))
+            sizeV, seedV = _plan_shards(nshards*shard_size, shard_size, seed, kwargs.get('sampler', 'mc'))
+
+            for UM, XM, shard_stats in _classical_shards(S, E, U_T, sizeV, omega, seedV, nworkers, kwargs):
+
+                toc = time.perf_counter()
+                summary.update(UM, XM)
+                endpointsM.append( list(np.percentile(UM[:,0], qV)) + list(np.percentile(XM[:,-1], qV)) )
+                stats['aggregate_seconds'] = stats.get('aggregate_seconds', 0) + time.perf_counter() - toc
+                _record_shard(stats, shard_stats, len(UM), tic, callback)
+
+            if checkpoint is not None:
+                state.update({ 'summary': summary, 'endpointsM': endpointsM, 'n_children_spawned': seed.n_children_spawned })
+                save_checkpoint(checkpoint, state)
+
+    # the run is finished, so a later run starts afresh
+    if checkpoint is not None and os.path.isfile(checkpoint):
+        os.remove(checkpoint)
+
+    seD = dict(zip(names, map(float, seV)))
+
+    return summary, seD
+
+def _exact_transitions(keyV, S0, S1, d0, omega=None, tail_mass=1e-12, **kwargs):
+
+    # The transitions of the classical backward step from each state key = 2*U1 + impossibleFlag in keyV.
+    # Returns the index of the source state, the destination key and the probability of each transition,
+    # and the mass of each source's mid-P tail that was lumped onto the last U0 of its curve.
+    # kwargs are passed to get_midP_curve, e.g. biasedurn, cache, backend
+
+    rowL = list(); destL = list(); probL = list()
+    lumpedV = np.zeros(len(keyV))
+
+    # both flags of a U1 share its mid-P curve
+    U1V, firstV = np.unique(keyV // 2, return_index=True)
+
+    for U1, first in zip(U1V, firstV):
+
+        U0V, midPV = get_midP_curve(S0, S1, int(U1), d0, omega=omega, tail_mass=tail_mass, **kwargs)
+        min_poss_U0 = U1 + d0
+
+        # the bound is U0V[j] when midPV[j] >= alpha > midPV[j+1]; the last U0 takes the whole tail
+        probV = np.append(midPV - np.append(midPV[1:], 0), 1 - midPV[0])
+
+        for i in range(first, len(keyV)):
+
+            if keyV[i] // 2 != U1:
+                break
+            flag = keyV[i] % 2
+            lumpedV[i] = midPV[-1]
+
+            # a bound of min_poss_U0 keeps the flag, larger bounds clear it, and alpha > midPV[0] is the impossible region
+            destV = np.append(2*U0V, 2*min_poss_U0 + 1 if flag else 2*max(min_poss_U0-1, 0) + 1)
+            destV[0] += flag
+
+            rowL.append(np.full(len(destV), i))
+            destL.append(destV)
+            probL.append(probV)
+
+    return np.concatenate(rowL), np.concatenate(destL), np.concatenate(probL), lumpedV
+
+def _pmf_quantile(valV, probV, q):
+
+    # the q'th percentile of a distribution over the sorted integers valV, the smallest value whose
+    # cumulative probability reaches q/100
+
+    cumV = np.cumsum(probV) / np.sum(probV)
+    return valV[ min(np.searchsorted(cumV, q/100, side='left'), len(valV)-1) ]
+
+def exact_classical(S, E, U_T=0, omega=None, percentile=95, tail_mass=1e-12, prune_mass=1e-12, joint=True, **kwargs):
+    '''
+    statsD, pmfD, error = exact_classical(S, E, U_T=0, omega=None, percentile=95, tail_mass=1e-12, prune_mass=1e-12, joint=True, **kwargs)
+
+    Computes the distribution of the classical method's U_t and X_t exactly, by dynamic programming
+    rather than Monte Carlo. Working backwards, U_{t-1} and the impossible flag depend only on U_t, the
+    flag and a uniform confidence level, so the replicates are a Markov chain over the states (U_t, flag),
+    with transition probabilities given by differences of the mid-P function (see get_midP_curve).
+    The probability mass is propagated backwards from U_T one timestep at a time as a sparse vector,
+    with one mid-P curve per value of U_t in its support.
+
+    The state space is truncated in two ways: each mid-P curve is cut off where it falls below tail_mass,
+    with the rest of the tail lumped onto its last value, and states whose probability falls below
+    prune_mass are dropped. The total of the lumped and dropped mass, error, bounds the total variation
+    distance between the distributions returned and the exact ones.
+
+    The distribution of X_t = S[0] + E[0] + U_0 - E[t] - S[t] - U_t depends on the joint distribution of U_t
+    and U_0, so if joint, the transition matrices between the states kept are stored, and a second pass carries
+    the conditional distribution of U_0 given each state forwards with sparse matrix products.
+    Otherwise only X_mean is returned for X.
+
+    S, E, U_T, omega:
+        as in classical_replicates
+    percentile:
+        float, the width of the percentile CI
+    tail_mass:
+        float, the mid-P value below which each curve is truncated
+    prune_mass:
+        float, the probability below which a state is dropped
+    joint:
+        boolean, whether to compute the distribution of X_t
+    kwargs:
+        passed to get_midP_curve, e.g. biasedurn, cache, backend
+    statsD:
+        dictionary of numpy arrays, the per-timestep statistics with the keys of ClassicalSummary.get_stats,
+        where the percentiles are the exact quantiles of the distributions
+    pmfD:
+        dictionary, where pmfD['U'][t] (and pmfD['X'][t] if joint) is a tuple of numpy arrays of
+        the values and their probabilities at timestep t
+    error:
+        float, the bound on the probability mass lost to truncation
+
+    >>> S = np.array([40, 38, 35, 33]); E = np.array([0, 3, 6, 9])
+    >>> statsD, pmfD, error = exact_classical(S, E)
+    >>> UM, XM = classical_replicates(S, E, nreps=20000, seed=42)
+    >>> bool( abs(statsD['U_mean'][0] - UM[:,0].mean()) < 0.1 and error < 1e-9 )
+    True
+    '''
+
+    d = S[1:] - S[:-1] + E[1:] - E[:-1]     # discoveries at each timestep
+    T_idx = len(S)                          # number of timesteps
+
+    # the backward pass: keyL[t] are the sorted state keys 2*U_t + flag, pL[t] their probabilities
+    # ---
+
+    keyL = [None]*T_idx; pL = [None]*T_idx
+    keyL[-1] = np.array([2*U_T]); pL[-1] = np.array([1.0])
+    error = 0
+
+    # if joint, the transition matrices between the states kept, KML[t] from keyL[t] to keyL[t-1]
+    KML = [None]*T_idx
+
+    for t in reversed(range(1, T_idx)):
+
+        rowV, destV, probV, lumpedV = _exact_transitions(keyL[t], S[t-1], S[t], d[t-1], omega, tail_mass, **kwargs)
+        error += np.dot(pL[t], lumpedV)
+
+        keyV, idxV = np.unique(destV, return_inverse=True)
+        pV = np.bincount(idxV, weights=pL[t][rowV]*probV)
+
+        keep = pV >= prune_mass
+        error += pV[~keep].sum()
+        keyL[t-1] = keyV[keep]; pL[t-1] = pV[keep]
+
+        if joint:
+            colV = np.cumsum(keep)[idxV] - 1
+            kept = keep[idxV]
+            KML[t] = sparse.csr_matrix( (probV[kept], (rowV[kept], colV[kept])), shape=(len(keyL[t]), len(keyL[t-1])) )
+
+    # the marginal distributions of U_t, collapsing the flag
+    # ---
+
+    pmfD = { 'U': list() }
+    for t in range(T_idx):
+        valV, idxV = np.unique(keyL[t] // 2, return_inverse=True)
+        pmfD['U'].append( (valV, np.bincount(idxV, weights=pL[t])) )
+
+    # the forward pass: MM[i,j] is the probability that U_0 = U0V[j] given state keyL[t][i]
+    # ---
+
+    if joint:
+
+        pmfD['X'] = list()
+        U0V = pmfD['U'][0][0]
+        MM = sparse.csr_matrix( (np.ones(len(keyL[0])), (np.arange(len(keyL[0])), np.searchsorted(U0V, keyL[0] // 2))), shape=(len(keyL[0]), len(U0V)) )
+
+        for t in range(T_idx):
+
+            if t > 0:
+                MM = KML[t] @ MM
+
+            # the joint distribution of (U_t, U_0), summed over the differences U_0 - U_t
+            JM = MM.multiply(pL[t][:,None]).tocoo()
+            diffV = U0V[JM.col] - keyL[t][JM.row] // 2
+            lo = diffV.min()
+            probV = np.bincount(diffV - lo, weights=JM.data)
+            valV = S[0] + E[0] - E[t] - S[t] + lo + np.arange(len(probV))
+
+            nz = probV > 0
+            pmfD['X'].append( (valV[nz], probV[nz]) )
+
+    # summary statistics
+    # ---
+
+    statsD = dict()
+    for var in pmfD:
+
+        statsD[var + '_mean'] = np.zeros(T_idx); statsD[var + '_var'] = np.zeros(T_idx)
+        statsD[var + '_lo'] = np.zeros(T_idx); statsD[var + '_hi'] = np.zeros(T_idx)
+
+        for t, (valV, probV) in enumerate(pmfD[var]):
+
+            probV = probV / probV.sum()
+            mean = np.dot(valV, probV)
+            statsD[var + '_mean'][t] = mean
+            statsD[var + '_var'][t] = np.dot((valV - mean)**2, probV)
+            statsD[var + '_lo'][t] = _pmf_quantile(valV, probV, (100-percentile)/2)
+            statsD[var + '_hi'][t] = _pmf_quantile(valV, probV, 100 - (100-percentile)/2)
+
+    if not joint:
+        statsD['X_mean'] = S[0] + E[0] + statsD['U_mean'][0] - E - S - statsD['U_mean']
+
+    return statsD, pmfD, error
+
+def sweep_omega(omegaV, S, E, U_T=0, nreps=10000, percentile=95, seed=None, fname=None, resume=False, batch_size=20000, common_random_numbers=False):
+    '''
+    results = sweep_omega(omegaV, S, E, U_T=0, nreps=10000, percentile=95, seed=None, fname=None, resume=False, batch_size=20000, common_random_numbers=False)
+
+    Estimates the total number of species N = S[0]+E[0]+U[0] using the classical method with the Fisher
+    variant for each value of omega in omegaV. Rather than running the replicates for each omega separately,
+    omega is treated as a batch axis: replicates for several omegas are worked backwards through the
+    timeseries together, sharing each timestep's call to find_U0_bnd_batch.
+
+    The replicates for each omega have their own random stream (spawned from seed), so the results for
+    an omega don't depend on which other omegas are in the sweep or on whether it was resumed.
+    Alternatively, with common_random_numbers, every omega uses the same confidence levels, so the
+    differences between the results for neighbouring omegas are due to omega alone, not sampling noise.
+
+    omegaV:
+        list of floats, the values of omega to explore
+    S, E:
+        numpy arrays of integers, the number of detected extant and extinct species at each timestep,
+        e.g. from get_SE
+    U_T:
+        integer, the number of undetected extant species at the final timestep
+    nreps:
+        integer, the number of replicates per omega
+    percentile:
+        float, the CI to report
+    seed:
+        integer, seed for numpy.random.SeedSequence
+    fname:
+        string, optional CSV file that the results are saved to as each batch of omegas is completed,
+        with header omega,N_mean,N_lo,N_hi,nreps
+    resume:
+        logical, if True, omegas that are already in fname are not rerun
+    batch_size:
+        integer, the maximum number of replicates (over all omegas) worked backwards at once
+    common_random_numbers:
+        logical, if True, every omega uses the same matrix of confidence levels (set seed too if resuming,
+        so that the resumed omegas get the same matrix)
+    results:
+        numpy structured array with fields omega, N_mean, N_lo, N_hi, nreps, one row per omega in omegaV
+    '''
+
+    d = S[1:] - S[:-1] + E[1:] - E[:-1]     # discoveries at each timestep
+    T_idx = len(S)                          # number of timesteps
+
+    rowsD = dict()  # omega as a string -> row of results
+
+    # find which omegas have already been done
+
+    if fname is not None and resume and os.path.isfile(fname):
+
+        csv_f = csv.reader(open(fname))
+        next(csv_f) # skip the header
+        rowsD = { row[0]: ( float(row[0]), float(row[1]), float(row[2]), float(row[3]), int(row[4]) ) for row in csv_f }
+
+
+    # each omega gets its own random stream
+
+    seedV = np.random.SeedSequence(seed).spawn(len(omegaV))
+    if common_random_numbers:
+        seedV = [ seedV[0] ]*len(omegaV) # the same stream, so the same confidence levels
+    todo = [ i for i, omega in enumerate(omegaV) if str(float(omega)) not in rowsD ]
+    omegas_per_batch = max(1, batch_size // nreps)
+
+    for b in range(0, len(todo), omegas_per_batch):
+
+        batch = todo[b:b+omegas_per_batch]
+
+        # draw the confidence levels and work all the replicates for this batch of omegas backwards together
+
+        alphaM = np.concatenate([ np.random.default_rng(seedV[i]).random((nreps, T_idx-1)) for i in batch ])
+        omegaR = np.repeat([ float(omegaV[i]) for i in batch ], nreps)
+
+        U = _backward_pass(alphaM, S, d, U_T, omegaR)
+        NM = ( S[0] + E[0] + U[:,0] ).reshape(len(batch), nreps) # assumes X(0) = 0
+
+        # summary statistics for each omega in the batch
+
+        for i, NV in zip(batch, NM):
+
+            omega = float(omegaV[i])
+            row = ( omega, np.mean(NV), np.percentile(NV, (100-percentile)/2), np.percentile(NV, 100 - (100-percentile)/2), nreps )
+            rowsD[str(omega)] = row
+
+        if fname is not None:
+
+            # rewrite the results so far, atomically, so a partially completed sweep can be resumed
+            # even if it's killed while writing
+
+            f = open(fname + '.tmp', 'w')
+            f.write('omega,N_mean,N_lo,N_hi,nreps\n')
+            for row in rowsD.values():
+                f.write( ','.join( list(map(str, row)) ) )
+                f.write('\n')
+            f.close()
+
+            os.replace(fname + '.tmp', fname)
+
+    results = np.array( [ rowsD[str(float(omega))] for omega in omegaV ],
+            dtype=[ ('omega', float), ('N_mean', float), ('N_lo', float), ('N_hi', float), ('nreps', int) ] )
+
+    return results
+    
+# old version of find_U0_bnd, use find_U0_bnd instead
+def inverse_midp(alpha, min_poss_U0, S0, S1, U1, d0, omega=None, biasedurn=None, cache=None, backend='logspace', stats=None):
+    '''
+    U0_bnd = inverse_midp(alpha, min_poss_U0, S0, S1, U1, d0, omega=None, biasedurn=None, cache=None, backend='logspace', stats=None)
+
+    Find the bound for the number of undetected extant species at the previous timestep (U0)
+    given the data at a given timestep (S1, U1, d0 etc.) and confidence level using the
+    mid-P method.
+
+    By default the model used is the central hypergeometric distribution. When omega is specified,
+    the Fisher non-central hypergeometric distribution is used instead.
+
+    alpha:
+        float, confidence level (e.g. obtained by randomly sampling ~ U(0,1))
+    min_poss_U0:
+        integer, the minimum possible value of undetected extant species at the previous timestep
+    S0:
+        integer, the number of detected extant species at the previous timestep
+    S1:
+        integer, the number of detected extant species at the current timestep
+    U1:
+        integer, the number of undetected extant species at the current timestep
     d0:
         integer, the number of species detected during the previous timestep
     omega:
@@ -347,19 +2442,27 @@ def inverse_midp(alpha, min_poss_U0, S0, S1, U1, d0, omega=None, biasedurn=None)
         can be modelled. It needs to be loaded and passed from the function that
         calls this function, allong with the objects passer, 
         i.e. rpy2.robjects.numpy2ri.activate(); biasedurn = rpy2.robjects.packages.importr('BiasedUrn')
+        If biasedurn is None, the Fisher variant is computed natively (see midP_fisher)
+    cache:
+        MidPCache, optional cache of mid-P values shared between calls (e.g. between replicates)
+    backend:
+        string, 'logspace' (default) or 'scipy', how the central variant's mid-P function is computed,
+        see get_midP_fnc
+    stats:
+        dictionary, optional, where the counts 'calls' and 'midP_evals' are accumulated, as in find_U0_bnd
     '''
 
 
     # define the mid-P function that we will be using
     # ---
 
-    if omega: # doing the Fisher variant
-
-        midP_fnc = lambda U0, S0, S1, U1, d0: 0.5 * ( biasedurn.pFNCHypergeo( U1+d0, U0, S0, S1+U1, omega )[0] + biasedurn.pFNCHypergeo( U1+d0-1, U0, S0, S1+U1, omega )[0] )
+    midP_fnc = get_midP_fnc(omega, biasedurn, backend)
+    if cache is not None:
+        midP_fnc = cache.wrap(midP_fnc, omega)
 
-    else: # central hypergeom, assumes equal probability of extinction
-
-        midP_fnc = lambda U0, S0, S1, U1, d0: 0.5 * ( hypergeom.cdf( U1+d0, S0+U0, U0, S1+U1 ) + hypergeom.cdf( U1+d0-1, S0+U0, U0, S1+U1 ) )
+    if stats is not None:
+        stats['calls'] = stats.get('calls', 0) + 1
+        midP_fnc = _count_midP_evals(midP_fnc, stats)
 
 
     # obtain a sample value of U0 at our confidence level alpha